@@ -0,0 +1,120 @@
+import asyncio
+
+import frappe
+from telegram import Message
+
+from frappe_telegram.client import (
+    get_telegram_user_id, render_message_from_template, resolve_file, sanitize_message_text)
+from frappe_telegram.frappe_telegram.doctype.telegram_bot import DEFAULT_TELEGRAM_BOT_KEY
+from frappe_telegram.handlers.logging import log_outgoing_message
+from frappe_telegram.utils.bots import get_bot_client, get_rate_limiter, submit_async
+
+"""
+asyncio counterparts of `frappe_telegram.client`, for sending to many chats concurrently
+
+The coroutines are awaited on the caller's event loop, in the caller's thread, so
+resolving users, rendering templates and logging run with the caller's frappe
+context. Only the Telegram API calls are handed to the shared bot event loop, where
+they go through the same pooled clients and per-bot rate limits as the sync client.
+
+From synchronous code such as an RQ job, use `run_sync`:
+
+    from frappe_telegram import aio
+
+    aio.run_sync(aio.gather_send(
+        aio.send_message("Report is ready", user=user) for user in users
+    ))
+"""
+
+DEFAULT_CONCURRENCY = 16
+
+
+async def send_message(message_text: str, parse_mode=None, user=None, telegram_user=None,
+                       from_bot=None) -> Message:
+    """
+    Send a message using a bot to a Telegram User
+
+    Takes the same arguments as `frappe_telegram.client.send_message`
+    """
+    message_text = sanitize_message_text(message_text, parse_mode)
+
+    telegram_user_id = get_telegram_user_id(user=user, telegram_user=telegram_user)
+    if not from_bot:
+        from_bot = frappe.db.get_default(DEFAULT_TELEGRAM_BOT_KEY)
+
+    bot = get_bot_client(from_bot)
+    message = await _on_bot_loop(from_bot, bot.send_message(
+        telegram_user_id, text=message_text, parse_mode=parse_mode))
+    log_outgoing_message(telegram_bot=from_bot, result=message)
+    return message
+
+
+async def send_file(file, filename=None, message=None, parse_mode=None, user=None, telegram_user=None,
+                    from_bot=None) -> Message:
+    """
+    Send a file to a Telegram User
+
+    Takes the same arguments as `frappe_telegram.client.send_file`
+    """
+    message = sanitize_message_text(message, parse_mode)
+
+    telegram_user_id = get_telegram_user_id(user=user, telegram_user=telegram_user)
+    if not from_bot:
+        from_bot = frappe.db.get_default(DEFAULT_TELEGRAM_BOT_KEY)
+
+    file = resolve_file(file)
+
+    bot = get_bot_client(from_bot)
+    result = await _on_bot_loop(from_bot, bot.send_document(
+        telegram_user_id, document=file, filename=filename, caption=message, parse_mode=parse_mode))
+    log_outgoing_message(telegram_bot=from_bot, result=result)
+    return result
+
+
+async def send_message_from_template(template: str, context: dict = None, lang: str = None,
+                                     parse_mode=None, user=None, telegram_user=None,
+                                     from_bot=None) -> Message:
+    """
+    Use a Telegram Message Template to send a message
+
+    Takes the same arguments as `frappe_telegram.client.send_message_from_template`
+    """
+    message = render_message_from_template(template, context=context, lang=lang)
+
+    return await send_message(message, parse_mode, user, telegram_user, from_bot)
+
+
+async def gather_send(sends, concurrency: int = DEFAULT_CONCURRENCY, return_exceptions: bool = True) -> list:
+    """
+    Await many sends with at most `concurrency` of them in flight
+
+    sends: `Iterable[Awaitable]`
+        e.g. `send_message(...)` coroutines
+    concurrency: `int`
+        Maximum number of sends awaited at once
+    return_exceptions: `bool`
+        Return exceptions in place of results instead of raising the first one
+
+    Returns the results in the order of `sends`
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(send):
+        async with semaphore:
+            return await send
+
+    return await asyncio.gather(*(bounded(send) for send in sends), return_exceptions=return_exceptions)
+
+
+def run_sync(coro):
+    """
+    Run an `aio` coroutine to completion from synchronous code, e.g. an RQ job
+
+    Must not be called from a running event loop; await the coroutine there instead
+    """
+    return asyncio.run(coro)
+
+
+async def _on_bot_loop(telegram_bot, coro):
+    # Bot clients belong to the shared bot event loop, so their calls run there
+    return await asyncio.wrap_future(submit_async(get_rate_limiter(telegram_bot).run(coro)))
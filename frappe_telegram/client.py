@@ -1,12 +1,13 @@
 import os
 import frappe
-from frappe import _
 from frappe.core.doctype.file.file import File
-from frappe.utils.jinja import render_template
 from frappe_telegram import Bot, ParseMode
 from frappe_telegram.utils.formatting import strip_unsupported_html_tags
 from frappe_telegram.frappe_telegram.doctype.telegram_bot import DEFAULT_TELEGRAM_BOT_KEY
 from frappe_telegram.handlers.logging import log_outgoing_message
+from frappe_telegram.utils.bots import get_bot_client, get_rate_limiter, run_async
+from frappe_telegram.utils.telegram_users import resolve_telegram_user_ids
+from frappe_telegram.utils.templates import render_named_template
 
 """
 The functions defined here is provided to invoke the bot
@@ -38,7 +39,8 @@ def send_message(message_text: str, parse_mode=None, user=None, telegram_user=No
         from_bot = frappe.db.get_default(DEFAULT_TELEGRAM_BOT_KEY)
 
     bot = get_bot(from_bot)
-    message = bot.send_message(telegram_user_id, text=message_text, parse_mode=parse_mode)
+    message = run_async(get_rate_limiter(from_bot).run(
+        bot.send_message(telegram_user_id, text=message_text, parse_mode=parse_mode)))
     log_outgoing_message(telegram_bot=from_bot, result=message)
 
 
@@ -65,6 +67,21 @@ def send_file(file, filename=None, message=None, parse_mode=None, user=None, tel
     if not from_bot:
         from_bot = frappe.db.get_default(DEFAULT_TELEGRAM_BOT_KEY)
 
+    file = resolve_file(file)
+
+    bot = get_bot(from_bot)
+    result = run_async(get_rate_limiter(from_bot).run(
+        bot.send_document(telegram_user_id, document=file, filename=filename, caption=message,
+                          parse_mode=parse_mode)))
+    log_outgoing_message(telegram_bot=from_bot, result=result)
+
+
+def resolve_file(file):
+    """
+    Opens internal file paths and File docs, so they can be uploaded
+
+    Anything else (file_id, URL, file object, bytes) is returned unchanged
+    """
     if isinstance(file, File):
         file = file.file_url
 
@@ -78,22 +95,18 @@ def send_file(file, filename=None, message=None, parse_mode=None, user=None, tel
         if os.path.exists(file_path):
             file = open(file_path, 'rb')
 
-    bot = get_bot(from_bot)
-    result = bot.send_document(telegram_user_id, document=file, filename=filename, caption=message,
-                               parse_mode=parse_mode)
-    log_outgoing_message(telegram_bot=from_bot, result=result)
+    return file
 
 
 def get_telegram_user_id(user=None, telegram_user=None):
     if not user and not telegram_user:
         frappe.throw(frappe._("Please specify either frappe-user or telegram-user"))
 
-    telegram_user_id = None
-    if user and frappe.db.exists("Telegram User", {"user": user}):
-        telegram_user_id = frappe.db.get_value("Telegram User", {"user": user}, "telegram_user_id")
-
-    if telegram_user and not telegram_user_id:
-        telegram_user_id = frappe.db.get_value("Telegram User", telegram_user, "telegram_user_id")
+    telegram_user_ids = resolve_telegram_user_ids(
+        users=[user] if user else None,
+        telegram_users=[telegram_user] if telegram_user else None
+    )
+    telegram_user_id = telegram_user_ids.get(user) or telegram_user_ids.get(telegram_user)
 
     if not telegram_user_id:
         frappe.throw(frappe._("Telegram user do not exist"))
@@ -102,12 +115,12 @@ def get_telegram_user_id(user=None, telegram_user=None):
 
 
 def get_bot(telegram_bot) -> Bot:
-    from telegram.ext import ExtBot
-    telegram_bot = frappe.get_doc("Telegram Bot", telegram_bot)
+    """
+    Returns the process' shared client of a Telegram Bot
 
-    return ExtBot(
-        token=telegram_bot.get_password("api_token")
-    )
+    Its methods are coroutines; call them through `frappe_telegram.utils.bots.run_async`
+    """
+    return get_bot_client(telegram_bot)
 
 
 @frappe.whitelist()
@@ -138,34 +151,10 @@ def render_message_from_template(template: str, context: dict = None, lang: str
     context: `dict`
         dict of key:values to resolve the tags in the template
     lang: `str`
-        Optionally can be set if an alternative template language is needed
+        Optionally can be set if an alternative template language is needed.
+        Falls back to the base language ("pt" for "pt-BR"), then to the default template
     """
-    dt = "Telegram Message Template"
-
-    templates = frappe.get_all(
-        dt,
-        filters=[{"name": template}]
-    )
-
-    if not templates:
-        frappe.throw(_("No template with name '{0}' exists.").format(template))
-
-    template_doc = frappe.get_doc(dt, templates[0].name)
-
-    if not context:
-        context = {}
-
-    template = ""
-
-    if lang:
-        for translation in template_doc.template_translations:
-            if translation.language == lang:
-                template = translation.template
-
-    if not template:
-        template = template_doc.default_template
-
-    return render_template(template, context)
+    return render_named_template(template, context=context, lang=lang)
 
 
 def validate_parse_mode(parse_mode: ParseMode) -> None:
@@ -3,4 +3,12 @@ from frappe.model.document import Document
 
 
 class HelpdeskTelegramSettings(Document):
-	pass
+	def validate(self):
+		for row in self.notification_recipients:
+			if not row.user and not row.role:
+				frappe.throw(frappe._("Row {0}: Set a User or a Role for the notification recipient").format(row.idx))
+
+	def on_update(self):
+		from frappe_telegram.handlers.helpdesk_notifications import clear_notification_recipients_cache
+
+		clear_notification_recipients_cache()
@@ -1,6 +1,15 @@
 import frappe
 from frappe.model.document import Document
 
+from frappe_telegram.handlers.helpdesk_reply import add_telegram_ticket, remove_telegram_ticket
+
 
 class HelpdeskTelegramTicket(Document):
-	pass
+	def after_insert(self):
+		add_telegram_ticket(self.ticket)
+
+	def on_trash(self):
+		if not frappe.db.exists(
+			"Helpdesk Telegram Ticket", {"ticket": self.ticket, "name": ("!=", self.name)}
+		):
+			remove_telegram_ticket(self.ticket)
@@ -4,6 +4,7 @@
 import frappe
 from frappe.model.document import Document
 from frappe_telegram.frappe_telegram.doctype.telegram_bot import DEFAULT_TELEGRAM_BOT_KEY
+from frappe_telegram.utils.bots import clear_bot_token_cache
 
 
 class TelegramBot(Document):
@@ -19,6 +20,13 @@ class TelegramBot(Document):
         if not default_bot:
             self.mark_as_default()
 
+    def on_update(self):
+        # Other workers must not re-cache the old token under the new version
+        frappe.db.after_commit.add(clear_bot_token_cache)
+
+    def on_trash(self):
+        frappe.db.after_commit.add(clear_bot_token_cache)
+
     def after_delete(self):
         default_bot = frappe.db.get_default(DEFAULT_TELEGRAM_BOT_KEY)
 
@@ -0,0 +1,15 @@
+// Copyright (c) 2026, Leam Technology Systems and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on('Telegram Broadcast', {
+	refresh: function(frm) {
+		if (frm.is_new() || frm.doc.status === 'Completed') {
+			return;
+		}
+
+		const label = frm.doc.status === 'Draft' ? __('Send') : __('Resume');
+		frm.add_custom_button(label, () => {
+			frm.call('send').then(() => frm.reload_doc());
+		});
+	}
+});
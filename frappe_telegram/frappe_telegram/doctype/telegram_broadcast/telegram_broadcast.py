@@ -0,0 +1,236 @@
+# Copyright (c) 2026, Leam Technology Systems and contributors
+# For license information, please see license.txt
+
+import asyncio
+import json
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.query_builder.functions import Count
+from frappe.utils import add_to_date, now_datetime
+from telegram.error import RetryAfter
+
+from frappe_telegram.client import (
+    render_message_from_template, sanitize_message_text, validate_parse_mode
+)
+from frappe_telegram.frappe_telegram.doctype.telegram_bot import DEFAULT_TELEGRAM_BOT_KEY
+from frappe_telegram.utils.bots import get_bot_client, get_rate_limiter, run_async
+from frappe_telegram.utils.templates import render_source
+
+# Recipients sent between two progress checkpoints
+BATCH_SIZE = 200
+# Messages in flight at once; the bot's RateLimiter sets the pace
+CONCURRENCY = 16
+MAX_RETRIES = 3
+
+# A Queued or Sending broadcast untouched for this long lost its job
+STALLED_AFTER_MINUTES = 15
+
+
+class TelegramBroadcast(Document):
+    def validate(self):
+        if not self.template and not self.message:
+            frappe.throw(_("Please set either a Template or a Message"))
+
+        if not self.from_bot:
+            self.from_bot = frappe.db.get_default(DEFAULT_TELEGRAM_BOT_KEY)
+
+        if self.context:
+            try:
+                json.loads(self.context)
+            except ValueError:
+                frappe.throw(_("Context must be a valid JSON object"))
+
+        validate_parse_mode(self.parse_mode or None)
+
+    @frappe.whitelist()
+    def send(self):
+        """
+        Queues the broadcast, or resumes it from its last checkpoint
+        """
+        if self.status == "Completed":
+            frappe.throw(_("This broadcast has already been sent"))
+
+        self.db_set("status", "Queued")
+        enqueue_broadcast(self.name)
+
+    def get_messages(self, languages):
+        """
+        Returns {language: message}, rendering the message once per language
+        """
+        context = json.loads(self.context) if self.context else {}
+        messages = {}
+        for lang in languages:
+            if self.template:
+                message = render_message_from_template(self.template, context=context, lang=lang or None)
+            else:
+                message = render_source(self.message, context)
+            messages[lang] = sanitize_message_text(message, self.parse_mode or None)
+        return messages
+
+
+def enqueue_broadcast(broadcast):
+    frappe.enqueue(
+        "frappe_telegram.frappe_telegram.doctype.telegram_broadcast.telegram_broadcast.run_broadcast",
+        queue="long",
+        timeout=4 * 60 * 60,
+        job_id=f"telegram_broadcast::{broadcast}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        broadcast=broadcast,
+    )
+
+
+def run_broadcast(broadcast):
+    """
+    Background job that sends a Telegram Broadcast
+
+    Recipients are processed in batches ordered by name. After each batch the
+    delivery logs, counters and `last_recipient` are committed together, so a
+    crashed or timed out job resumes after the last finished batch.
+    """
+    doc = frappe.get_doc("Telegram Broadcast", broadcast)
+    if doc.status not in ("Queued", "Sending"):
+        return
+
+    if not doc.started_on:
+        doc.db_set({
+            "started_on": now_datetime(),
+            "total_recipients": get_broadcast_recipients(doc, count=True),
+        })
+    doc.db_set("status", "Sending")
+    frappe.db.commit()
+
+    try:
+        bot = get_bot_client(doc.from_bot)
+        limiter = get_rate_limiter(doc.from_bot)
+        messages = {}
+
+        while True:
+            recipients = get_broadcast_recipients(doc, after=doc.last_recipient)
+            if not recipients:
+                break
+
+            new_languages = {r.language or "" for r in recipients} - set(messages)
+            if new_languages:
+                messages.update(doc.get_messages(new_languages))
+
+            results = run_async(
+                _send_batch(bot, limiter, recipients, messages, doc.parse_mode or None),
+                timeout=None,
+            )
+            _insert_logs(doc.name, recipients, results)
+
+            sent = sum(1 for message_id, error in results if not error)
+            doc.db_set({
+                "last_recipient": recipients[-1].name,
+                "sent_count": (doc.sent_count or 0) + sent,
+                "failed_count": (doc.failed_count or 0) + len(results) - sent,
+            })
+            frappe.db.commit()
+    except Exception:
+        frappe.db.rollback()
+        doc.db_set("status", "Failed")
+        frappe.db.commit()
+        frappe.log_error(frappe.get_traceback(), "Telegram Broadcast Error")
+        return
+
+    doc.db_set({"status": "Completed", "completed_on": now_datetime()})
+
+
+def get_broadcast_recipients(doc, after=None, limit=BATCH_SIZE, count=False):
+    """
+    Telegram Users a broadcast goes to, with the language of their User
+
+    Returns the next `limit` recipients after the Telegram User named `after`,
+    or only their total with `count`.
+    """
+    TelegramUser = frappe.qb.DocType("Telegram User")
+    User = frappe.qb.DocType("User")
+    HasRole = frappe.qb.DocType("Has Role")
+
+    query = (
+        frappe.qb.from_(TelegramUser)
+        .left_join(User)
+        .on(User.name == TelegramUser.user)
+        .where(TelegramUser.telegram_user_id.isnotnull() & (TelegramUser.telegram_user_id != ""))
+    )
+
+    if doc.role:
+        query = query.where(TelegramUser.user.isin(
+            frappe.qb.from_(HasRole)
+            .select(HasRole.parent)
+            .where((HasRole.role == doc.role) & (HasRole.parenttype == "User"))
+        ))
+    if doc.role or not doc.include_guests:
+        query = query.where(User.enabled == 1)
+    else:
+        query = query.where((User.enabled == 1) | TelegramUser.user.isnull() | (TelegramUser.user == ""))
+
+    if count:
+        return query.select(Count("*")).run()[0][0]
+
+    if after:
+        query = query.where(TelegramUser.name > after)
+
+    return (
+        query.select(TelegramUser.name, TelegramUser.telegram_user_id, User.language)
+        .orderby(TelegramUser.name)
+        .limit(limit)
+        .run(as_dict=True)
+    )
+
+
+async def _send_batch(bot, limiter, recipients, messages, parse_mode):
+    """Sends to every recipient concurrently; returns [(message_id, error)] in recipient order"""
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def send(recipient):
+        async with semaphore:
+            for attempt in range(MAX_RETRIES):
+                await limiter.wait()
+                try:
+                    message = await bot.send_message(
+                        recipient.telegram_user_id,
+                        text=messages[recipient.language or ""],
+                        parse_mode=parse_mode,
+                    )
+                    return message.message_id, None
+                except RetryAfter as e:
+                    if attempt == MAX_RETRIES - 1:
+                        return None, str(e)[:140]
+                    await asyncio.sleep(float(e.retry_after))
+                except Exception as e:
+                    return None, str(e)[:140]
+
+    return await asyncio.gather(*(send(r) for r in recipients))
+
+
+def _insert_logs(broadcast, recipients, results):
+    now = now_datetime()
+    owner = frappe.session.user or "Administrator"
+    fields = ["name", "owner", "modified_by", "creation", "modified", "docstatus",
+              "broadcast", "telegram_user", "status", "message_id", "error"]
+    rows = [
+        (frappe.generate_hash(length=10), owner, owner, now, now, 0,
+         broadcast, recipient.name, "Failed" if error else "Sent",
+         str(message_id) if message_id else None, error)
+        for recipient, (message_id, error) in zip(recipients, results)
+    ]
+    frappe.db.bulk_insert("Telegram Broadcast Log", fields, rows)
+
+
+def resume_stalled_broadcasts():
+    """
+    Scheduled job that re-queues broadcasts whose job died without finishing
+    """
+    for broadcast in frappe.get_all(
+        "Telegram Broadcast",
+        filters={
+            "status": ("in", ("Queued", "Sending")),
+            "modified": ("<", add_to_date(now_datetime(), minutes=-STALLED_AFTER_MINUTES)),
+        },
+        pluck="name",
+    ):
+        enqueue_broadcast(broadcast)
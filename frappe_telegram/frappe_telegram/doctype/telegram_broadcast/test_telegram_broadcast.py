@@ -0,0 +1,28 @@
+# Copyright (c) 2026, Leam Technology Systems and Contributors
+# See license.txt
+
+import unittest
+
+import frappe
+from frappe.exceptions import ValidationError
+
+
+class TestTelegramBroadcast(unittest.TestCase):
+
+    def test_requires_message_or_template(self):
+        broadcast = frappe.get_doc(frappe._dict(
+            doctype="Telegram Broadcast",
+            title="Test Broadcast",
+        ))
+        with self.assertRaises(ValidationError):
+            broadcast.insert()
+
+    def test_rejects_invalid_context(self):
+        broadcast = frappe.get_doc(frappe._dict(
+            doctype="Telegram Broadcast",
+            title="Test Broadcast",
+            message="Hello {{name}}",
+            context="{not json",
+        ))
+        with self.assertRaises(ValidationError):
+            broadcast.insert()
@@ -5,6 +5,8 @@ import frappe
 from frappe.model.document import Document
 from telegram import Bot
 
+from frappe_telegram.utils.bots import run_async
+
 
 class TelegramMessage(Document):
     def after_insert(self):
@@ -19,9 +21,9 @@ class TelegramMessage(Document):
         chat = frappe.get_doc("Telegram Chat", self.chat)
         bot: Bot = chat.get_bot()
         try:
-            bot.delete_message(chat_id=chat.chat_id, message_id=self.message_id)
+            run_async(bot.delete_message(chat_id=chat.chat_id, message_id=self.message_id))
             # Let's also send in ***** the message to the User's Chat
-            bot.send_message(chat_id=chat.chat_id, text=self.content)
+            run_async(bot.send_message(chat_id=chat.chat_id, text=self.content))
         except Exception:
             pass
 
@@ -3,7 +3,12 @@
 
 # import frappe
 from frappe.model.document import Document
+from frappe_telegram.utils.templates import clear_template_cache
 
 
 class TelegramMessageTemplate(Document):
-    pass
+    def on_update(self):
+        clear_template_cache()
+
+    def on_trash(self):
+        clear_template_cache()
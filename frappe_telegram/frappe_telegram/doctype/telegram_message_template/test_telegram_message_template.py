@@ -6,7 +6,7 @@ from re import template
 
 import frappe
 from frappe.exceptions import ValidationError
-from frappe_telegram.client import send_message_from_template
+from frappe_telegram.client import render_message_from_template, send_message_from_template
 from frappe_telegram.frappe_telegram.doctype.telegram_user.test_telegram_user import \
     TelegramUserFixtures
 from frappe_telegram.utils.test_fixture import TestFixture
@@ -93,3 +93,21 @@ class TestTelegramMessageTemplate(unittest.TestCase):
         #     templates[1].template_translations[0].language,
         #     telegram_user=self.templates.get_dependencies("Telegram User")[0].name
         # )
+
+    def test_render_each_language_from_cache(self):
+        "One template name renders its own text per language, from the compiled cache"
+
+        template = self.templates.fixtures.get("Telegram Message Template")[1]
+
+        for _ in range(2):
+            self.assertEqual(
+                render_message_from_template(template.name, {"test": "1"}, lang="ja"),
+                "This is the translation 1")
+            self.assertEqual(
+                render_message_from_template(template.name, {"test": "2"}),
+                "This is a test template 2")
+
+        # Falls back from the regional variant, and unknown variables stay visible
+        self.assertEqual(
+            render_message_from_template(template.name, lang="ja-JP"),
+            "This is the translation {{ test }}")
@@ -4,5 +4,12 @@
 # import frappe
 from frappe.model.document import Document
 
+from frappe_telegram.utils.telegram_users import clear_telegram_user_id_cache
+
+
 class TelegramUser(Document):
-	pass
+	def on_update(self):
+		clear_telegram_user_id_cache()
+
+	def on_trash(self):
+		clear_telegram_user_id_cache()
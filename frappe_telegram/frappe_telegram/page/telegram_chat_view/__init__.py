@@ -1,11 +1,13 @@
 import frappe
 
+from frappe_telegram.utils.telegram_users import resolve_telegram_user_ids
+
 
 @frappe.whitelist()
 def get_telegram_chat(chat_type, user=None, group=None):
     chat_type = chat_type.lower()
     if chat_type == "private":
-        telegram_user_id = frappe.db.get_value("Telegram User", {"user": user}, "telegram_user_id")
+        telegram_user_id = resolve_telegram_user_ids(users=[user]).get(user)
         if not telegram_user_id:
             frappe.throw(frappe._("No TelegramUser account exists for user: {0}").format(user))
 
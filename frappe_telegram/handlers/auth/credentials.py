@@ -6,6 +6,7 @@ from frappe_telegram import (
     InlineKeyboardMarkup, ConversationHandler, MessageHandler,
     InlineKeyboardButton)
 from frappe_telegram.utils.conversation import collect_conversation_details
+from frappe_telegram.utils.telegram_users import clear_telegram_user_id_cache
 from frappe.integrations.doctype.ldap_settings.ldap_settings import LDAPSettings
 
 LOGIN_CONV_ENTER = frappe.generate_hash()
@@ -69,6 +70,7 @@ def collect_login_credentials(update: Update, context: CallbackContext):
         # Authenticated! Lets link FrappeUser & TelegramUser
         update.message.reply_text("You have successfully logged in as: " + user.name)
         context.telegram_user.db_set("user", user.name)
+        clear_telegram_user_id_cache()
         raise DispatcherHandlerStop(state=ConversationHandler.END)
     else:
         update.message.reply_text("You have entered invalid credentials. Please try again")
@@ -104,6 +106,7 @@ def collect_signup_details(update: Update, context: CallbackContext):
     user.insert(ignore_permissions=True)
 
     context.telegram_user.db_set("user", user.name)
+    clear_telegram_user_id_cache()
     update.effective_chat.send_message(
         frappe._("You have successfully signed up as: {0}").format(
             user.name))
@@ -2,20 +2,44 @@ import json
 import re
 
 import frappe
-from frappe.utils.file_manager import save_file as save_file_to_disk
 
+from frappe_telegram.handlers.helpdesk_attachments import (
+	DONE_KEYBOARD,
+	STATE_DOCTYPE,
+	enqueue_followup_attachment,
+	enqueue_state_attachment,
+	extract_file_ref,
+	get_attachment_hint,
+	get_state_attachments,
+)
 from frappe_telegram.handlers.telegram_api import (
 	answer_callback_query,
-	download_telegram_file,
-	get_file_info,
+	answer_inline_query,
+	edit_message_text_api,
 	send_message_api,
 )
+from frappe_telegram.utils.templates import render_source
+
+# Tickets shown per "My Tickets" page
+MY_TICKETS_PAGE_SIZE = 5
+
+# Options shown per page when picking a value for a Link field
+LINK_PICKER_PAGE_SIZE = 8
+
+# Inline ticket search: max results and how long Telegram may cache them per user
+INLINE_SEARCH_LIMIT = 20
+INLINE_SEARCH_CACHE_TIME = 30
 
 
 def process_update(update_data, token, settings):
 	"""Process a single Telegram update through the helpdesk state machine."""
 	frappe.set_user("Administrator")
 
+	# Inline mode (@bot <query>) has no chat or conversation state
+	if update_data.get("inline_query"):
+		handle_inline_query(update_data["inline_query"], token)
+		return
+
 	# Extract message or callback_query
 	message = update_data.get("message")
 	callback_query = update_data.get("callback_query")
@@ -24,11 +48,13 @@ def process_update(update_data, token, settings):
 		callback_data = callback_query.get("data", "")
 		user_info = callback_query.get("from", {})
 		chat_info = callback_query.get("message", {}).get("chat", {})
+		callback_message_id = callback_query.get("message", {}).get("message_id")
 		text = ""
 		# Acknowledge the callback
 		answer_callback_query(callback_query["id"], token)
 	elif message:
 		callback_data = ""
+		callback_message_id = None
 		user_info = message.get("from", {})
 		chat_info = message.get("chat", {})
 		text = message.get("text", "") or message.get("caption", "")
@@ -55,8 +81,11 @@ def process_update(update_data, token, settings):
 	elif text == "/newticket" or callback_data == "create_ticket":
 		handle_new_ticket(telegram_user, telegram_chat, chat_id, token, settings, state)
 
-	elif callback_data == "my_tickets":
-		handle_my_tickets(telegram_user, chat_id, token)
+	elif callback_data == "my_tickets" or callback_data.startswith("my_tickets:"):
+		handle_my_tickets(telegram_user, chat_id, token, callback_data, callback_message_id)
+
+	elif callback_data.startswith("ticket_info:"):
+		handle_ticket_info(callback_data, telegram_user, chat_id, token, callback_message_id)
 
 	elif text == "/cancel":
 		reset_conversation(state)
@@ -189,22 +218,20 @@ def get_or_create_conversation_state(telegram_user_name, telegram_chat_name):
 
 def reset_conversation(state):
 	"""Reset conversation state to idle and clean up orphaned attachments."""
-	# Delete any unattached files from a cancelled ticket creation
-	try:
-		data = json.loads(state.collected_data or "{}")
-		for file_name in data.get("_attachments", []):
-			if frappe.db.exists("File", file_name):
-				file_doc = frappe.get_doc("File", file_name)
-				if not file_doc.attached_to_doctype:
-					file_doc.delete(ignore_permissions=True)
-	except Exception:
-		pass
-
+	# Save first: the row lock makes in-flight uploads wait and then see the
+	# draft session gone, so nothing is attached after the cleanup below.
 	state.state = "idle"
 	state.collected_data = "{}"
 	state.current_field_index = 0
 	state.save(ignore_permissions=True)
 
+	# Delete any files left over from a cancelled ticket creation
+	try:
+		for f in get_state_attachments(state.name):
+			frappe.delete_doc("File", f.name, ignore_permissions=True)
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Telegram Helpdesk: attachment cleanup")
+
 
 # --- Welcome menu ---
 
@@ -319,7 +346,11 @@ def init_field_collection(state, settings):
 
 	state.state = "collecting_fields"
 	state.current_field_index = 0
-	state.collected_data = json.dumps({"_fields": conversation_fields})
+	state.collected_data = json.dumps({
+		"_fields": conversation_fields,
+		# Identifies this draft so late background uploads can't leak into the next one
+		"_session": frappe.generate_hash(length=10),
+	})
 	state.save(ignore_permissions=True)
 
 
@@ -331,7 +362,7 @@ def map_field_to_meta(field):
 		"Text": "str",
 		"Text Editor": "str",
 		"Select": "select",
-		"Link": "str",  # Will be overridden below if options fetched
+		"Link": "link",
 		"Int": "int",
 		"Float": "float",
 	}
@@ -348,35 +379,21 @@ def map_field_to_meta(field):
 		meta["options"] = field["options"]
 		meta["type"] = "select"
 	
-	# Handle Link fields - fetch options from linked doctype
+	# Handle Link fields - options are paged from the linked doctype when asked,
+	# so a Customer/Product link never loads the whole table up front
 	elif field.get("fieldtype") == "Link" and field.get("options"):
 		linked_doctype = field["options"]
-		try:
-			# Fetch records from linked doctype
+		if frappe.db.exists("DocType", linked_doctype):
+			meta["options"] = linked_doctype
 			# For HD Ticket Status, only show enabled statuses
-			filters = {}
 			if linked_doctype == "HD Ticket Status":
-				filters["enabled"] = 1
-			
-			# Get all records — for priorities, show highest first
-			order_by = "name"
+				meta["link_filters"] = {"enabled": 1}
+			# For priorities, show highest first
 			if linked_doctype == "HD Ticket Priority":
-				order_by = "integer_value desc"
-
-			records = frappe.get_all(
-				linked_doctype,
-				filters=filters,
-				fields=["name"],
-				order_by=order_by
-			)
-			
-			if records:
-				# Convert to newline-separated options
-				options = "\n".join([r.name for r in records])
-				meta["options"] = options
-				meta["type"] = "select"
-		except Exception:
-			# If doctype doesn't exist or error fetching, log and keep as str
+				meta["link_order_by"] = "integer_value desc"
+		else:
+			# If doctype doesn't exist, log and keep as str
+			meta["type"] = "str"
 			frappe.log_error(
 				f"Could not fetch options for Link field {field.get('fieldname')} "
 				f"from doctype {linked_doctype}",
@@ -386,6 +403,155 @@ def map_field_to_meta(field):
 	return meta
 
 
+# --- Link field picker ---
+
+def get_link_options(field, query="", after=None, start=0):
+	"""One page (+1 row to detect more) of names for a Link field.
+
+	``query`` is matched as a name prefix so the lookup stays on the primary
+	key index. Pages are read with a keyset cursor (``name > after``), so a
+	deep page costs the same as the first. Doctypes listed in another order
+	(``link_order_by``, e.g. priorities) are small lookup tables and are
+	paged by ``start`` instead.
+	"""
+	filters = [
+		[fieldname, *value] if isinstance(value, (list, tuple)) else [fieldname, "=", value]
+		for fieldname, value in (field.get("link_filters") or {}).items()
+	]
+	if query:
+		filters.append(["name", "like", f"{_escape_like(query)}%"])
+
+	order_by = field.get("link_order_by")
+	if order_by:
+		return frappe.get_all(
+			field["options"],
+			filters=filters,
+			order_by=order_by,
+			limit_start=start,
+			limit_page_length=LINK_PICKER_PAGE_SIZE + 1,
+			pluck="name",
+		)
+
+	if after:
+		filters.append(["name", ">", after])
+	return frappe.get_all(
+		field["options"],
+		filters=filters,
+		order_by="name asc",
+		limit_page_length=LINK_PICKER_PAGE_SIZE + 1,
+		pluck="name",
+	)
+
+
+def _escape_like(text):
+	"""Escape LIKE wildcards typed by the user."""
+	return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_link_picker(field, data, query="", page=0):
+	"""Build the inline keyboard for one page of a Link field and remember it in ``data``.
+
+	Buttons carry the option's index on the page rather than its value, which
+	keeps callback_data within Telegram's 64-byte limit for any name. For the
+	same reason the pager buttons carry a page number, and the keyset cursor
+	of each page reached so far (the last name of the page before it) is
+	kept with the picker.
+	"""
+	picker = data.get("_picker") or {}
+	cursors = picker.get("cursors") or [None]
+	if not page or picker.get("key") != field["key"] or picker.get("query") != query or page >= len(cursors):
+		page, cursors = 0, [None]
+
+	values = get_link_options(field, query, after=cursors[page], start=page * LINK_PICKER_PAGE_SIZE)
+	has_next = len(values) > LINK_PICKER_PAGE_SIZE
+	values = values[:LINK_PICKER_PAGE_SIZE]
+	cursors = cursors[: page + 1]
+	if has_next:
+		cursors.append(values[-1])
+	data["_picker"] = {
+		**picker,
+		"key": field["key"],
+		"query": query,
+		"page": page,
+		"cursors": cursors,
+		"values": values,
+	}
+
+	rows = [[{"text": v, "callback_data": f"pick:{i}"}] for i, v in enumerate(values)]
+	pager = []
+	if page:
+		pager.append({"text": "⬅️ Previous", "callback_data": f"pick_page:{page - 1}"})
+	if has_next:
+		pager.append({"text": "Next ➡️", "callback_data": f"pick_page:{page + 1}"})
+	if pager:
+		rows.append(pager)
+	return {"inline_keyboard": rows}
+
+
+def send_link_picker(state, data, field, prompt, chat_id, token, query="", parse_mode=None):
+	"""Send a Link field prompt with its first picker page and save the picker in the state."""
+	keyboard = build_link_picker(field, data, query)
+	if not data["_picker"]["values"]:
+		keyboard = None
+		prompt = f"{prompt}\n\n🔍 No matches found. Type another search."
+	else:
+		prompt = f"{prompt}\n\n🔍 Pick one below, or type to search."
+
+	response = send_message_api(chat_id, token, prompt, reply_markup=keyboard, parse_mode=parse_mode)
+	# Later pages edit this message, so they keep its hint and current value
+	data["_picker"].update(
+		message_id=((response or {}).get("result") or {}).get("message_id"),
+		prompt=prompt,
+		parse_mode=parse_mode,
+	)
+	state.collected_data = json.dumps(data)
+	state.save(ignore_permissions=True)
+
+
+def resolve_link_input(text, field, data, state, chat_id, token):
+	"""Turn picker callbacks or typed text into a Link value.
+
+	Returns the selected name, or None when the input was a page turn or a
+	search and a new picker page was shown instead.
+	"""
+	picker = data.get("_picker") or {}
+
+	if text.startswith("pick:"):
+		values = picker.get("values", []) if picker.get("key") == field["key"] else []
+		index = text[len("pick:"):]
+		if index.isdigit() and int(index) < len(values):
+			data.pop("_picker", None)
+			return values[int(index)]
+		send_link_picker(state, data, field, "⚠️ That option has expired. Please choose again.", chat_id, token)
+		return None
+
+	if text.startswith("pick_page:"):
+		page = text[len("pick_page:"):]
+		keyboard = build_link_picker(field, data, picker.get("query", ""), int(page) if page.isdigit() else 0)
+		if picker.get("message_id"):
+			edit_message_text_api(
+				chat_id, picker["message_id"], token,
+				picker.get("prompt") or f"📝 {field['prompt']}\n\n🔍 Pick one below, or type to search.",
+				reply_markup=keyboard,
+				parse_mode=picker.get("parse_mode"),
+			)
+		state.collected_data = json.dumps(data)
+		state.save(ignore_permissions=True)
+		return None
+
+	# An exact name is accepted directly; anything else is a search
+	value = text.strip()
+	filters = dict(field.get("link_filters") or {})
+	filters["name"] = value
+	name = frappe.db.exists(field["options"], filters)
+	if name:
+		data.pop("_picker", None)
+		return name
+
+	send_link_picker(state, data, field, f"🔍 Results for '{value}':", chat_id, token, query=value)
+	return None
+
+
 def ask_next_field(state, chat_id, token):
 	"""Ask the user for the next field in the template."""
 	data = json.loads(state.collected_data or "{}")
@@ -397,15 +563,19 @@ def ask_next_field(state, chat_id, token):
 	field = fields[state.current_field_index]
 	reply_markup = None
 
+	optional_hint = "" if field.get("required") else " (optional, send /skip to skip)"
+	prompt = f"📝 {field['prompt']}{optional_hint}"
+
+	if field.get("type") == "link":
+		send_link_picker(state, data, field, prompt, chat_id, token)
+		return
+
 	if field.get("type") == "select" and field.get("options"):
 		options = [o for o in field["options"].split("\n") if o.strip()]
 		if options:
 			keyboard = {"inline_keyboard": [[{"text": opt, "callback_data": opt}] for opt in options]}
 			reply_markup = keyboard
 
-	optional_hint = "" if field.get("required") else " (optional, send /skip to skip)"
-	prompt = f"📝 {field['prompt']}{optional_hint}"
-
 	send_message_api(chat_id, token, prompt, reply_markup=reply_markup)
 
 
@@ -445,6 +615,12 @@ def handle_field_input(text, telegram_user, telegram_chat, chat_id, token, setti
 		send_message_api(chat_id, token, "⚠️ This field is required. Please try again.")
 		return
 
+	# Resolve Link picker selections / searches
+	if current_field.get("type") == "link":
+		text = resolve_link_input(text, current_field, data, state, chat_id, token)
+		if not text:
+			return
+
 	# Validate select
 	if current_field.get("type") == "select" and current_field.get("options"):
 		valid_options = [o.strip() for o in current_field["options"].split("\n") if o.strip()]
@@ -541,13 +717,9 @@ def show_ticket_review(state, telegram_user, telegram_chat, chat_id, token, sett
 				review_lines.append(f"\n*{_escape_markdown(label)}:* None")
 
 		# Show attachment info
-		attachments = data.get("_attachments", [])
+		attachments = get_state_attachments(state.name)
 		if attachments:
-			filenames = []
-			for file_name in attachments:
-				fname = frappe.db.get_value("File", file_name, "file_name")
-				if fname:
-					filenames.append(_escape_markdown(fname))
+			filenames = [_escape_markdown(f.file_name) for f in attachments if f.file_name]
 			review_lines.append(f"\n*Attachments ({len(attachments)}):* {', '.join(filenames)}")
 
 		review_message = "\n".join(review_lines)
@@ -608,8 +780,9 @@ def handle_edit_field(field_key, telegram_user, telegram_chat, chat_id, token, s
 		return
 
 	# Store which field we're editing
+	data["_editing_field"] = field_key
 	state.state = "editing_field"
-	state.collected_data = json.dumps({**data, "_editing_field": field_key})
+	state.collected_data = json.dumps(data)
 	state.save(ignore_permissions=True)
 
 	# Show current value and ask for new value
@@ -619,6 +792,13 @@ def handle_edit_field(field_key, telegram_user, telegram_chat, chat_id, token, s
 	else:
 		current_text = "\n\n*Current value:* _(not set)_"
 	
+	optional_hint = "" if field.get("required") else " (optional, send /skip to skip)"
+	prompt = f"{field['prompt']}{optional_hint}{current_text}"
+
+	if field.get("type") == "link":
+		send_link_picker(state, data, field, prompt, chat_id, token, parse_mode="Markdown")
+		return
+
 	reply_markup = None
 	if field.get("type") == "select" and field.get("options"):
 		options = [o for o in field["options"].split("\n") if o.strip()]
@@ -626,9 +806,6 @@ def handle_edit_field(field_key, telegram_user, telegram_chat, chat_id, token, s
 			keyboard = {"inline_keyboard": [[{"text": opt, "callback_data": opt}] for opt in options]}
 			reply_markup = keyboard
 
-	optional_hint = "" if field.get("required") else " (optional, send /skip to skip)"
-	prompt = f"{field['prompt']}{optional_hint}{current_text}"
-
 	send_message_api(chat_id, token, prompt, reply_markup=reply_markup, parse_mode="Markdown")
 
 
@@ -668,6 +845,12 @@ def handle_editing_field_input(text, telegram_user, telegram_chat, chat_id, toke
 		send_message_api(chat_id, token, "⚠️ This field is required. Please try again.")
 		return
 
+	# Resolve Link picker selections / searches
+	if field.get("type") == "link":
+		text = resolve_link_input(text, field, data, state, chat_id, token)
+		if not text:
+			return
+
 	# Validate select
 	if field.get("type") == "select" and field.get("options"):
 		valid_options = [o.strip() for o in field["options"].split("\n") if o.strip()]
@@ -708,87 +891,32 @@ def handle_attach_document_start(state, chat_id, token):
 	state.state = "awaiting_attachment"
 	state.save(ignore_permissions=True)
 
-	data = json.loads(state.collected_data or "{}")
-	count = len(data.get("_attachments", []))
+	count = len(get_state_attachments(state.name))
 	count_msg = f"\n{count} file(s) attached so far." if count else ""
+	hint = get_attachment_hint(frappe.get_cached_doc("Helpdesk Telegram Settings"))
 
-	keyboard = {
-		"inline_keyboard": [
-			[{"text": "✅ Done", "callback_data": "done_attaching"}],
-		]
-	}
 	send_message_api(
 		chat_id, token,
-		f"📎 Send me a document, photo, or video to attach to your ticket.{count_msg}\n\nPress Done when finished.",
-		reply_markup=keyboard,
+		f"📎 Send me a document, photo, or video to attach to your ticket.{count_msg}{hint}\n\nPress Done when finished.",
+		reply_markup=DONE_KEYBOARD,
 	)
 
 
 def handle_attachment_upload(message, state, chat_id, token):
-	"""Process a file upload during the awaiting_attachment state."""
+	"""Process a file upload during the awaiting_attachment state.
+
+	The download runs in a background job; the user gets an immediate
+	acknowledgement here and a confirmation once the file is attached.
+	"""
 	if not message:
 		return
 
-	# Extract file_id from document, photo, or video
-	file_id = None
-	file_name = None
-
-	if message.get("document"):
-		file_id = message["document"]["file_id"]
-		file_name = message["document"].get("file_name", "document")
-	elif message.get("photo"):
-		# Photos come as an array of sizes; pick the largest
-		file_id = message["photo"][-1]["file_id"]
-		file_name = "photo.jpg"
-	elif message.get("video"):
-		file_id = message["video"]["file_id"]
-		file_name = message["video"].get("file_name", "video.mp4")
-
-	if not file_id:
+	file_ref = extract_file_ref(message)
+	if not file_ref:
 		send_message_api(chat_id, token, "⚠️ Please send a document, photo, or video.")
 		return
 
-	# Download from Telegram
-	try:
-		settings = frappe.get_cached_doc("Helpdesk Telegram Settings")
-		bot_doc = frappe.get_doc("Telegram Bot", settings.bot)
-		bot_token = bot_doc.get_password("api_token")
-	except Exception:
-		send_message_api(chat_id, token, "❌ Error: could not retrieve bot token.")
-		return
-
-	tg_file_path = get_file_info(file_id, bot_token)
-	if not tg_file_path:
-		send_message_api(chat_id, token, "❌ Error retrieving file info from Telegram. Please try again.")
-		return
-
-	file_bytes = download_telegram_file(tg_file_path, bot_token)
-	if not file_bytes:
-		send_message_api(chat_id, token, "❌ Error downloading file. Please try again.")
-		return
-
-	# Save as a private Frappe File (unattached for now)
-	file_doc = save_file_to_disk(file_name, file_bytes, "", "", is_private=1)
-	frappe.db.commit()
-
-	# Store in collected_data._attachments
-	data = json.loads(state.collected_data or "{}")
-	attachments = data.get("_attachments", [])
-	attachments.append(file_doc.name)
-	data["_attachments"] = attachments
-	state.collected_data = json.dumps(data)
-	state.save(ignore_permissions=True)
-
-	keyboard = {
-		"inline_keyboard": [
-			[{"text": "✅ Done", "callback_data": "done_attaching"}],
-		]
-	}
-	send_message_api(
-		chat_id, token,
-		f"✅ File '{file_name}' attached. ({len(attachments)} total)\nSend more or press Done.",
-		reply_markup=keyboard,
-	)
+	enqueue_state_attachment(state, message, file_ref, chat_id, token)
 
 
 def handle_submit_ticket(telegram_user, telegram_chat, chat_id, token, settings, state):
@@ -846,14 +974,15 @@ def create_ticket(data, telegram_user, telegram_chat, chat_id, token, settings,
 		reset_conversation(state)
 		return
 
-	# Link uploaded attachments to the ticket
-	for file_name in data.get("_attachments", []):
-		if frappe.db.exists("File", file_name):
-			file_doc = frappe.get_doc("File", file_name)
-			file_doc.attached_to_doctype = "HD Ticket"
-			file_doc.attached_to_name = ticket_doc.name
-			file_doc.save(ignore_permissions=True)
-	frappe.db.commit()
+	# Link uploaded attachments to the ticket. Lock the state row first so an
+	# upload still in flight waits and is then rejected by the session check
+	# instead of being attached to the draft after we have moved its files.
+	frappe.db.get_value(STATE_DOCTYPE, state.name, "name", for_update=True)
+	for f in get_state_attachments(state.name):
+		file_doc = frappe.get_doc("File", f.name)
+		file_doc.attached_to_doctype = "HD Ticket"
+		file_doc.attached_to_name = ticket_doc.name
+		file_doc.save(ignore_permissions=True)
 
 	# Create mapping for two-way communication
 	frappe.get_doc({
@@ -866,6 +995,7 @@ def create_ticket(data, telegram_user, telegram_chat, chat_id, token, settings,
 
 	# Reset conversation state
 	reset_conversation(state)
+	frappe.db.commit()
 
 	# Management notifications
 	try:
@@ -876,7 +1006,7 @@ def create_ticket(data, telegram_user, telegram_chat, chat_id, token, settings,
 
 	# Send confirmation to Telegram user
 	try:
-		msg = frappe.render_template(
+		msg = render_source(
 			settings.ticket_created_message or "Ticket #{{ ticket.name }} created: {{ ticket.subject }}",
 			{"ticket": ticket_doc},
 		)
@@ -909,6 +1039,14 @@ def handle_reopen_ticket(callback_data, telegram_user, chat_id, token):
 		ticket.flags.ignore_version = True
 		ticket.save(ignore_permissions=True)
 
+		from frappe_telegram.handlers.helpdesk_notifications import (
+			build_rich_status_reopened_message,
+			get_recipient_language,
+			invalidate_ticket_snapshot,
+		)
+
+		invalidate_ticket_snapshot(ticket_name)
+
 		frappe.db.set_value("Helpdesk Telegram Ticket", mapping, "is_open", 1)
 		frappe.db.commit()
 
@@ -923,10 +1061,7 @@ def handle_reopen_ticket(callback_data, telegram_user, chat_id, token):
 		)
 
 		# Rich Telegram message to user (synchronous — only reads data)
-		from frappe_telegram.handlers.helpdesk_notifications import (
-			build_rich_status_reopened_message,
-		)
-		msg = build_rich_status_reopened_message(ticket_name)
+		msg = build_rich_status_reopened_message(ticket_name, lang=get_recipient_language(ticket_name))
 		send_message_api(chat_id, token, msg, parse_mode="HTML")
 	except Exception as e:
 		frappe.log_error(frappe.get_traceback(), "Telegram Helpdesk: reopen ticket")
@@ -935,28 +1070,172 @@ def handle_reopen_ticket(callback_data, telegram_user, chat_id, token):
 
 # --- My Tickets ---
 
-def handle_my_tickets(telegram_user, chat_id, token):
-	"""Show user's open tickets."""
-	mappings = frappe.get_all(
-		"Helpdesk Telegram Ticket",
-		filters={"telegram_user": telegram_user.name, "is_open": 1},
-		fields=["ticket"],
+def handle_my_tickets(telegram_user, chat_id, token, callback_data="my_tickets", message_id=None):
+	"""Show one page of the user's open tickets, newest first.
+
+	``callback_data`` is ``my_tickets`` for a fresh list, or
+	``my_tickets:<n|p>:<cursor>`` to page forwards/backwards from a mapping
+	name; paging edits the list message in place.
+	"""
+	direction, cursor = "n", 0
+	if callback_data.startswith("my_tickets:"):
+		_, direction, cursor = callback_data.split(":", 2)
+		cursor = int(cursor or 0)
+
+	tickets = get_open_tickets_page(telegram_user.name, direction, cursor)
+	has_more = len(tickets) > MY_TICKETS_PAGE_SIZE
+	tickets = tickets[:MY_TICKETS_PAGE_SIZE]
+	if direction == "p":
+		tickets.reverse()
+		has_prev, has_next = has_more, True
+	else:
+		has_prev, has_next = bool(cursor), has_more
+
+	if not tickets:
+		msg = "📭 You have no open tickets. Tap /start to create one."
+		if message_id and callback_data != "my_tickets":
+			edit_message_text_api(chat_id, message_id, token, msg)
+		else:
+			send_message_api(chat_id, token, msg)
+		return
+
+	from frappe.utils import escape_html
+
+	lines = ["📋 <b>Your open tickets:</b>\n"]
+	buttons = []
+	for t in tickets:
+		lines.append(f"🎫 #{t.name} - {escape_html(t.subject or '')} ({escape_html(t.status or '')})")
+		buttons.append({"text": f"🔍 #{t.name}", "callback_data": f"ticket_info:{t.name}"})
+
+	# Per-ticket quick actions, two per row, then the pager
+	keyboard = [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+	pager = []
+	if has_prev:
+		pager.append({"text": "⬅️ Previous", "callback_data": f"my_tickets:p:{tickets[0].mapping}"})
+	if has_next:
+		pager.append({"text": "Next ➡️", "callback_data": f"my_tickets:n:{tickets[-1].mapping}"})
+	if pager:
+		keyboard.append(pager)
+
+	msg = "\n".join(lines)
+	reply_markup = {"inline_keyboard": keyboard}
+	if message_id and callback_data != "my_tickets":
+		edit_message_text_api(chat_id, message_id, token, msg, reply_markup=reply_markup, parse_mode="HTML")
+	else:
+		send_message_api(chat_id, token, msg, reply_markup=reply_markup, parse_mode="HTML")
+
+
+def get_open_tickets_page(telegram_user_name, direction="n", cursor=0):
+	"""Fetch one page (+1 row to detect more) of open tickets with a single joined query.
+
+	Keyset pagination on the autoincrement mapping name keeps every page a
+	bounded index range scan, however many tickets the user has.
+	"""
+	from frappe.query_builder import Order
+
+	Mapping = frappe.qb.DocType("Helpdesk Telegram Ticket")
+	Ticket = frappe.qb.DocType("HD Ticket")
+	query = (
+		frappe.qb.from_(Mapping)
+		.join(Ticket)
+		.on(Ticket.name == Mapping.ticket)
+		.select(Mapping.name.as_("mapping"), Ticket.name, Ticket.subject, Ticket.status)
+		.where(Mapping.telegram_user == telegram_user_name)
+		.where(Mapping.is_open == 1)
+		.limit(MY_TICKETS_PAGE_SIZE + 1)
 	)
+	if direction == "p":
+		query = query.where(Mapping.name > cursor).orderby(Mapping.name, order=Order.asc)
+	else:
+		if cursor:
+			query = query.where(Mapping.name < cursor)
+		query = query.orderby(Mapping.name, order=Order.desc)
+
+	return query.run(as_dict=True)
 
-	if not mappings:
-		send_message_api(chat_id, token, "📭 You have no open tickets. Tap /start to create one.")
+
+def handle_ticket_info(callback_data, telegram_user, chat_id, token, message_id=None):
+	"""Quick action from My Tickets: show a ticket's details in place of the list."""
+	ticket_name = callback_data.replace("ticket_info:", "", 1)
+	if not frappe.db.exists(
+		"Helpdesk Telegram Ticket", {"ticket": ticket_name, "telegram_user": telegram_user.name}
+	):
+		send_message_api(chat_id, token, "❌ Ticket not found or does not belong to you.")
 		return
 
-	lines = ["📋 Your open tickets:\n"]
-	for m in mappings:
-		ticket = frappe.db.get_value(
-			"HD Ticket", m.ticket,
-			["name", "subject", "status"], as_dict=True,
+	from frappe_telegram.handlers.helpdesk_notifications import (
+		build_rich_ticket_details_message,
+		get_recipient_language,
+	)
+
+	msg = build_rich_ticket_details_message(ticket_name, lang=get_recipient_language(ticket_name))
+	keyboard = {"inline_keyboard": [[{"text": "⬅️ Back to My Tickets", "callback_data": "my_tickets:n:0"}]]}
+	if message_id:
+		edit_message_text_api(chat_id, message_id, token, msg, reply_markup=keyboard, parse_mode="HTML")
+	else:
+		send_message_api(chat_id, token, msg, reply_markup=keyboard, parse_mode="HTML")
+
+
+# --- Inline ticket search ---
+
+def handle_inline_query(inline_query, token):
+	"""Answer ``@bot <query>`` with the caller's own tickets matching the query."""
+	telegram_user = frappe.db.get_value(
+		"Telegram User", {"telegram_user_id": str(inline_query.get("from", {}).get("id"))}
+	)
+	if not telegram_user:
+		answer_inline_query(
+			inline_query["id"], token, [],
+			cache_time=INLINE_SEARCH_CACHE_TIME,
+			button={"text": "Start the support bot", "start_parameter": "start"},
+		)
+		return
+
+	results = []
+	for t in search_user_tickets(telegram_user, inline_query.get("query", "")):
+		# Sent as plain text, so nothing is escaped; a missing value must not read "None"
+		subject = t.subject or "(no subject)"
+		summary = f"🎫 Ticket #{t.name} - {subject} ({t.status or ''})"
+		results.append({
+			"type": "article",
+			"id": str(t.name),
+			"title": f"#{t.name} · {subject}",
+			"description": t.status or "",
+			"input_message_content": {"message_text": summary},
+		})
+
+	answer_inline_query(inline_query["id"], token, results, cache_time=INLINE_SEARCH_CACHE_TIME)
+
+
+def search_user_tickets(telegram_user_name, query=""):
+	"""Search a Telegram user's tickets by number or subject, newest first.
+
+	The indexed ``telegram_user`` filter narrows the join to the caller's own
+	tickets before the prefix matches run, so the search stays fast however
+	large HD Ticket grows. An empty query returns the latest tickets.
+	"""
+	from frappe.query_builder import Order
+
+	Mapping = frappe.qb.DocType("Helpdesk Telegram Ticket")
+	Ticket = frappe.qb.DocType("HD Ticket")
+	q = frappe.qb.from_(Mapping).join(Ticket).on(Ticket.name == Mapping.ticket)
+	q = (
+		q.select(Ticket.name, Ticket.subject, Ticket.status)
+		.where(Mapping.telegram_user == telegram_user_name)
+		.orderby(Mapping.name, order=Order.desc)
+		.limit(INLINE_SEARCH_LIMIT)
+	)
+
+	query = (query or "").strip().lstrip("#")
+	if query:
+		like = _escape_like(query)
+		q = q.where(
+			Ticket.name.like(f"{like}%")
+			| Ticket.subject.like(f"{like}%")
+			| Ticket.subject.like(f"% {like}%")
 		)
-		if ticket:
-			lines.append(f"🎫 #{ticket.name} - {ticket.subject} ({ticket.status})")
 
-	send_message_api(chat_id, token, "\n".join(lines))
+	return q.run(as_dict=True)
 
 
 # --- Follow-up messages ---
@@ -964,11 +1243,9 @@ def handle_my_tickets(telegram_user, chat_id, token):
 def handle_followup_or_prompt(text, telegram_user, telegram_chat, chat_id, token, message=None):
 	"""Handle a message that's not part of a ticket creation conversation."""
 	# Determine if the message contains an attachment
-	has_attachment = message and (
-		message.get("document") or message.get("photo") or message.get("video")
-	)
+	file_ref = extract_file_ref(message)
 
-	if not text and not has_attachment:
+	if not text and not file_ref:
 		return
 
 	# Check for open ticket mapping
@@ -979,94 +1256,63 @@ def handle_followup_or_prompt(text, telegram_user, telegram_chat, chat_id, token
 		as_dict=True,
 	)
 
-	if mapping:
-		ticket = frappe.get_doc("HD Ticket", mapping.ticket)
-		# Get email for sender
-		state = frappe.db.get_value(
-			"Telegram Conversation State",
-			{"telegram_user": telegram_user.name},
-			"email",
-		)
-		sender = state or telegram_user.full_name
-
-		# Download and save attachment if present
-		attachment_file = None
-		if has_attachment:
-			attachment_file = _download_followup_attachment(message, chat_id, token)
-
-		# Build communication content
-		content = text or ""
-		if attachment_file and not content:
-			content = f"[Attachment: {attachment_file.file_name}]"
-
-		comm = frappe.get_doc({
-			"doctype": "Communication",
-			"communication_type": "Communication",
-			"content": content,
-			"reference_doctype": "HD Ticket",
-			"reference_name": mapping.ticket,
-			"sender": sender,
-			"sent_or_received": "Received",
-			"subject": f"Re: {ticket.subject}",
-		}).insert(ignore_permissions=True)
-
-		# Link attachment to the HD Ticket so it's visible in the helpdesk
-		if attachment_file:
-			attachment_file.attached_to_doctype = "HD Ticket"
-			attachment_file.attached_to_name = mapping.ticket
-			attachment_file.save(ignore_permissions=True)
-			frappe.db.commit()
-
-		# Management notifications + rich confirmation
-		try:
-			from frappe_telegram.handlers.helpdesk_notifications import (
-				notify_user_response,
-				build_rich_followup_confirmation,
-			)
-			preview = text or (f"[Attachment: {attachment_file.file_name}]" if attachment_file else "")
-			notify_user_response(mapping.ticket, telegram_user.name, preview)
-			msg = build_rich_followup_confirmation(mapping.ticket)
-			send_message_api(chat_id, token, msg, parse_mode="HTML")
-		except Exception:
-			frappe.log_error(frappe.get_traceback(), "Telegram Helpdesk: notification error")
-			send_message_api(chat_id, token, f"\u2705 Message added to ticket #{mapping.ticket}")
-	else:
+	if not mapping:
 		send_message_api(chat_id, token, "💬 No open ticket found. Send /start to see options.")
+		return
 
+	if file_ref:
+		# Download in the background; the Communication is added once the file is saved
+		enqueue_followup_attachment(mapping.ticket, telegram_user.name, chat_id, token, message, file_ref, text)
+		return
 
-def _download_followup_attachment(message, chat_id, token):
-	"""Download a Telegram file attachment and save as a private Frappe File."""
-	file_id = None
-	file_name = None
+	add_followup_to_ticket(mapping.ticket, telegram_user, chat_id, token, text)
 
-	if message.get("document"):
-		file_id = message["document"]["file_id"]
-		file_name = message["document"].get("file_name", "document")
-	elif message.get("photo"):
-		file_id = message["photo"][-1]["file_id"]
-		file_name = "photo.jpg"
-	elif message.get("video"):
-		file_id = message["video"]["file_id"]
-		file_name = message["video"].get("file_name", "video.mp4")
 
-	if not file_id:
-		return None
+def add_followup_to_ticket(ticket_name, telegram_user, chat_id, token, text, attachment_files=None):
+	"""Add a follow-up message (and any saved Files) to a ticket and confirm it to the user."""
+	attachment_files = attachment_files or []
+	ticket = frappe.get_doc("HD Ticket", ticket_name)
+	# Get email for sender
+	state = frappe.db.get_value(
+		"Telegram Conversation State",
+		{"telegram_user": telegram_user.name},
+		"email",
+	)
+	sender = state or telegram_user.full_name
 
-	try:
-		settings = frappe.get_cached_doc("Helpdesk Telegram Settings")
-		bot_doc = frappe.get_doc("Telegram Bot", settings.bot)
-		bot_token = bot_doc.get_password("api_token")
-	except Exception:
-		return None
+	# Build communication content
+	attachment_note = ", ".join(f"[Attachment: {f.file_name}]" for f in attachment_files)
+	content = text or attachment_note
 
-	tg_file_path = get_file_info(file_id, bot_token)
-	if not tg_file_path:
-		return None
+	frappe.get_doc({
+		"doctype": "Communication",
+		"communication_type": "Communication",
+		"content": content,
+		"reference_doctype": "HD Ticket",
+		"reference_name": ticket_name,
+		"sender": sender,
+		"sent_or_received": "Received",
+		"subject": f"Re: {ticket.subject}",
+	}).insert(ignore_permissions=True)
 
-	file_bytes = download_telegram_file(tg_file_path, bot_token)
-	if not file_bytes:
-		return None
+	# Link attachments to the HD Ticket so they're visible in the helpdesk
+	for attachment_file in attachment_files:
+		attachment_file.attached_to_doctype = "HD Ticket"
+		attachment_file.attached_to_name = ticket_name
+		attachment_file.save(ignore_permissions=True)
+	if attachment_files:
+		frappe.db.commit()
 
-	file_doc = save_file_to_disk(file_name, file_bytes, "", "", is_private=1)
-	frappe.db.commit()
-	return file_doc
+	# Management notifications + rich confirmation
+	try:
+		from frappe_telegram.handlers.helpdesk_notifications import (
+			notify_user_response,
+			build_rich_followup_confirmation,
+			get_recipient_language,
+		)
+		notify_user_response(ticket_name, telegram_user.name, text or attachment_note)
+		msg = build_rich_followup_confirmation(ticket_name, lang=get_recipient_language(ticket_name))
+		send_message_api(chat_id, token, msg, parse_mode="HTML")
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Telegram Helpdesk: notification error")
+		send_message_api(chat_id, token, f"\u2705 Message added to ticket #{ticket_name}")
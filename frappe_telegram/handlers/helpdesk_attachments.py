@@ -0,0 +1,421 @@
+"""
+Background ingestion of Telegram attachments for the helpdesk flow.
+
+Fetching a file from Telegram (getFile, download, write to disk) can take many
+seconds for a large video. Doing it inline would stall the single poller loop
+for every other user, so the poller only extracts the file reference,
+acknowledges it and enqueues the actual download here.
+
+Files uploaded while a ticket is being drafted are attached to the user's
+``Telegram Conversation State`` until the ticket is created. Each upload is its
+own File row, so concurrent uploads never rewrite the state's JSON and the user
+can keep chatting while downloads complete.
+
+Albums arrive as one update per file sharing a ``media_group_id``. Those are
+buffered in Redis for a short quiet window, downloaded in parallel and attached
+together with a single confirmation.
+
+Telegram's ``file_unique_id`` is stable across re-sends of the same file, so it
+is remembered against the File that stored it. A re-sent screenshot is then
+linked to the existing on-disk content without being downloaded again.
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+from frappe.utils.file_manager import save_file as save_file_to_disk
+
+from frappe_telegram.handlers.telegram_api import fetch_file_bytes, send_message_api
+from frappe_telegram.utils.bots import get_helpdesk_bot_token
+
+STATE_DOCTYPE = "Telegram Conversation State"
+
+# Albums: wait until no new item has arrived for MEDIA_GROUP_WINDOW seconds,
+# but never longer than MEDIA_GROUP_MAX_WAIT in total.
+MEDIA_GROUP_KEY = "telegram_helpdesk_media_group"
+MEDIA_GROUP_WINDOW = 1.5
+MEDIA_GROUP_MAX_WAIT = 10
+MEDIA_GROUP_TTL = 120
+
+MAX_PARALLEL_DOWNLOADS = 4
+
+# One key per file_unique_id -> name of a File holding that content. Each
+# entry expires once unused for KNOWN_FILE_TTL, so the cache stays bounded.
+KNOWN_FILE_KEY = "telegram_helpdesk_file_unique_id"
+KNOWN_FILE_TTL = 7 * 24 * 3600
+
+DONE_KEYBOARD = {
+	"inline_keyboard": [
+		[{"text": "✅ Done", "callback_data": "done_attaching"}],
+	]
+}
+
+
+def extract_file_ref(message):
+	"""Return ``{"file_id", "file_name", "file_size"}`` for the document, photo or video in a message.
+
+	Documents are always taken as-is, which is the user's escape hatch for
+	keeping an image at full quality. Photos follow the configured size policy.
+	"""
+	if not message:
+		return None
+
+	if message.get("document"):
+		document = message["document"]
+		return {
+			"file_id": document["file_id"],
+			"file_unique_id": document.get("file_unique_id"),
+			"file_name": document.get("file_name", "document"),
+			"file_size": document.get("file_size"),
+		}
+	if message.get("photo"):
+		photo = select_photo_size(message["photo"], frappe.get_cached_doc("Helpdesk Telegram Settings"))
+		_log_photo_rendition(photo, message["photo"][-1])
+		return {
+			"file_id": photo["file_id"],
+			"file_unique_id": photo.get("file_unique_id"),
+			"file_name": "photo.jpg",
+			"file_size": photo.get("file_size"),
+		}
+	if message.get("video"):
+		video = message["video"]
+		return {
+			"file_id": video["file_id"],
+			"file_unique_id": video.get("file_unique_id"),
+			"file_name": video.get("file_name", "video.mp4"),
+			"file_size": video.get("file_size"),
+		}
+	return None
+
+
+def select_photo_size(sizes, settings):
+	"""Pick a rendition from a Telegram ``PhotoSize`` array according to settings.
+
+	Telegram orders renditions smallest first and includes ``width``, ``height``
+	and usually ``file_size``, so the choice is made without any extra request.
+	When no rendition satisfies the limit, the smallest one is used.
+
+	- Largest: the original behaviour, always the last rendition
+	- Max Dimension: the largest rendition whose longer side fits ``photo_max_dimension``
+	- Max File Size: the largest rendition within ``photo_max_file_size`` KB
+	"""
+	policy = settings.get("photo_size_policy") or "Largest"
+
+	if policy == "Max Dimension" and settings.get("photo_max_dimension"):
+		limit = settings.photo_max_dimension
+		fits = [s for s in sizes if max(s.get("width", 0), s.get("height", 0)) <= limit]
+	elif policy == "Max File Size" and settings.get("photo_max_file_size"):
+		limit = settings.photo_max_file_size * 1024
+		fits = [s for s in sizes if s.get("file_size") and s["file_size"] <= limit]
+	else:
+		return sizes[-1]
+
+	return fits[-1] if fits else sizes[0]
+
+
+def _log_photo_rendition(chosen, largest):
+	# Bytes fetched versus the largest rendition, so the effect of the photo
+	# size policy on bandwidth and disk can be read from the app log
+	if chosen is largest:
+		return
+	frappe.logger("frappe_telegram").info(
+		f"Photo rendition {chosen.get('width')}x{chosen.get('height')} "
+		f"({chosen.get('file_size') or 0} bytes) instead of "
+		f"{largest.get('width')}x{largest.get('height')} ({largest.get('file_size') or 0} bytes)"
+	)
+
+
+def get_attachment_hint(settings):
+	"""Tell users how to bypass photo downscaling, when it is enabled."""
+	if (settings.get("photo_size_policy") or "Largest") == "Largest":
+		return ""
+	return "\nTip: send images as a File to keep their original quality."
+
+
+def get_state_attachments(state_name):
+	"""Files uploaded for the ticket currently being drafted, oldest first."""
+	return frappe.get_all(
+		"File",
+		filters={"attached_to_doctype": STATE_DOCTYPE, "attached_to_name": state_name},
+		fields=["name", "file_name"],
+		order_by="creation asc",
+	)
+
+
+def get_draft_session(state):
+	"""Id of the ticket draft in progress; uploads are discarded if it changes.
+
+	Drafts started before drafts had an id get one the first time they are
+	touched here, so the late-upload guard covers them too.
+	"""
+	data = json.loads(state.collected_data or "{}")
+	if not data.get("_session"):
+		data["_session"] = frappe.generate_hash(length=10)
+		state.db_set("collected_data", json.dumps(data), update_modified=False)
+	return data["_session"]
+
+
+# --- Enqueue (runs in the poller) ---
+
+
+def enqueue_state_attachment(state, message, file_ref, chat_id, token):
+	"""Acknowledge an upload during ticket creation and download it in the background."""
+	target = {
+		"kind": "state",
+		"state_name": state.name,
+		"session": get_draft_session(state),
+		"chat_id": chat_id,
+	}
+	if message.get("media_group_id"):
+		if _buffer_media_group(message["media_group_id"], file_ref, target):
+			send_message_api(chat_id, token, "⏳ Receiving your files… I'll confirm once they are attached.")
+		return
+
+	_enqueue_ingest(target, [file_ref])
+	send_message_api(
+		chat_id, token,
+		f"⏳ Receiving '{file_ref['file_name']}'… I'll confirm once it is attached.",
+	)
+
+
+def enqueue_followup_attachment(ticket_name, telegram_user_name, chat_id, token, message, file_ref, text=""):
+	"""Acknowledge a follow-up attachment and add it to the ticket in the background."""
+	target = {
+		"kind": "followup",
+		"ticket_name": ticket_name,
+		"telegram_user_name": telegram_user_name,
+		"chat_id": chat_id,
+	}
+	# Album captions usually ride on one item only; keep them with the file
+	file_ref = {**file_ref, "caption": text or ""}
+	if message.get("media_group_id"):
+		if _buffer_media_group(message["media_group_id"], file_ref, target):
+			send_message_api(chat_id, token, f"⏳ Receiving your files for ticket #{ticket_name}…")
+		return
+
+	_enqueue_ingest(target, [file_ref])
+	send_message_api(
+		chat_id, token,
+		f"⏳ Receiving '{file_ref['file_name']}' for ticket #{ticket_name}…",
+	)
+
+
+def _enqueue_ingest(target, file_refs):
+	frappe.enqueue(
+		method="frappe_telegram.handlers.helpdesk_attachments.ingest_attachments",
+		queue="short",
+		target=target,
+		file_refs=file_refs,
+		enqueue_after_commit=True,
+	)
+
+
+def _buffer_media_group(media_group_id, file_ref, target):
+	"""Add an album item to its Redis buffer.
+
+	Returns True for the first item of the album, which also enqueues the
+	collector job; later items are only buffered.
+	"""
+	key = f"{MEDIA_GROUP_KEY}:{media_group_id}"
+	frappe.cache.rpush(key, json.dumps(file_ref))
+	frappe.cache.expire(frappe.cache.make_key(key), MEDIA_GROUP_TTL)
+
+	claimed = frappe.cache.set(frappe.cache.make_key(f"{key}:claimed"), 1, nx=True, ex=MEDIA_GROUP_TTL)
+	if not claimed:
+		return False
+
+	frappe.enqueue(
+		method="frappe_telegram.handlers.helpdesk_attachments.collect_media_group",
+		queue="short",
+		media_group_id=media_group_id,
+		target=target,
+		enqueue_after_commit=True,
+	)
+	return True
+
+
+# --- Background jobs ---
+
+
+def collect_media_group(media_group_id, target):
+	"""Wait for an album to finish arriving, then ingest all of its files at once."""
+	key = f"{MEDIA_GROUP_KEY}:{media_group_id}"
+	started = time.monotonic()
+	count = -1
+	while time.monotonic() - started < MEDIA_GROUP_MAX_WAIT:
+		new_count = frappe.cache.llen(key)
+		if new_count == count:
+			break
+		count = new_count
+		time.sleep(MEDIA_GROUP_WINDOW)
+
+	file_refs = [json.loads(r) for r in _claim_media_group(key)]
+	if file_refs:
+		ingest_attachments(target, file_refs)
+
+
+def _claim_media_group(key):
+	"""Atomically take every buffered item and release the album's claim, so
+	an item arriving afterwards starts a new collector instead of waiting
+	for one that has already finished."""
+	buffer_key = frappe.cache.make_key(key)
+	pipe = frappe.cache.pipeline()
+	pipe.lrange(buffer_key, 0, -1)
+	pipe.delete(buffer_key, frappe.cache.make_key(f"{key}:claimed"))
+	return pipe.execute()[0]
+
+
+def ingest_attachments(target, file_refs):
+	"""Download files in parallel and attach them to a ticket draft or an open ticket."""
+	token = _get_bot_token()
+	if not token:
+		return
+
+	downloaded, failed = _fetch_files(file_refs, token)
+	chat_id = target["chat_id"]
+	if failed:
+		names = ", ".join(f"'{r['file_name']}'" for r in failed)
+		send_message_api(chat_id, token, f"❌ Error downloading {names}. Please try again.")
+	if not downloaded:
+		return
+
+	if target["kind"] == "state":
+		_attach_to_draft(target, downloaded, chat_id, token)
+	else:
+		_attach_to_followup(target, downloaded, chat_id, token)
+
+
+def _attach_to_draft(target, downloaded, chat_id, token):
+	state_name = target["state_name"]
+	names = ", ".join(f"'{ref['file_name']}'" for ref, _ in downloaded)
+
+	# Lock the state row so a concurrent reset/submit either happens entirely
+	# before this check (and we discard the files) or waits until they are attached.
+	collected_data = frappe.db.get_value(STATE_DOCTYPE, state_name, "collected_data", for_update=True)
+	session = json.loads(collected_data or "{}").get("_session")
+	if not session or session != target["session"]:
+		frappe.db.rollback()
+		send_message_api(
+			chat_id, token,
+			f"⚠️ {names} arrived after the ticket draft was closed and was not attached.",
+		)
+		return
+
+	for ref, content in downloaded:
+		_store_file(ref, content, STATE_DOCTYPE, state_name)
+	frappe.db.commit()
+
+	count = len(get_state_attachments(state_name))
+	send_message_api(
+		chat_id, token,
+		f"✅ {names} attached. ({count} total)\nSend more or press Done.",
+		reply_markup=DONE_KEYBOARD,
+	)
+
+
+def _attach_to_followup(target, downloaded, chat_id, token):
+	file_docs = [_store_file(ref, content, "", "") for ref, content in downloaded]
+	frappe.db.commit()
+
+	from frappe_telegram.handlers.helpdesk import add_followup_to_ticket
+
+	text = "\n".join(ref["caption"] for ref, _ in downloaded if ref.get("caption"))
+	telegram_user = frappe.get_doc("Telegram User", target["telegram_user_name"])
+	add_followup_to_ticket(target["ticket_name"], telegram_user, chat_id, token, text, file_docs)
+	frappe.db.commit()
+
+
+# --- Helpers ---
+
+
+def _get_bot_token():
+	try:
+		return get_helpdesk_bot_token()
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Telegram Helpdesk: attachment bot token")
+		return None
+
+
+def _fetch_files(file_refs, token):
+	"""Resolve file contents, downloading only files not seen before.
+
+	Returns ``(downloaded, failed)`` where downloaded is a list of
+	``(file_ref, content)`` in the original order. ``content`` is either the
+	downloaded bytes or the already-stored File it duplicates.
+	"""
+	known = {i: _find_known_file(ref) for i, ref in enumerate(file_refs)}
+	to_fetch = [i for i, file_doc in known.items() if not file_doc]
+
+	futures = {}
+	if to_fetch:
+		with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_DOWNLOADS, len(to_fetch))) as pool:
+			futures = {i: pool.submit(fetch_file_bytes, file_refs[i]["file_id"], token) for i in to_fetch}
+
+	downloaded, failed = [], []
+	for i, ref in enumerate(file_refs):
+		if known[i]:
+			downloaded.append((ref, known[i]))
+			continue
+		try:
+			downloaded.append((ref, futures[i].result()))
+		except Exception as e:
+			frappe.log_error(str(e)[:140], "Telegram File Download Error")
+			failed.append(ref)
+	return downloaded, failed
+
+
+def _find_known_file(file_ref):
+	"""Return the stored File for a previously ingested ``file_unique_id``, if it still exists."""
+	unique_id = file_ref.get("file_unique_id")
+	if not unique_id:
+		return None
+
+	key = frappe.cache.make_key(f"{KNOWN_FILE_KEY}:{unique_id}")
+	file_name = frappe.cache.get(key)
+	if not file_name:
+		return None
+
+	file_doc = frappe.db.get_value(
+		"File", frappe.safe_decode(file_name),
+		["name", "file_url", "is_private", "content_hash", "file_size"],
+		as_dict=True,
+	)
+	if not file_doc or not file_doc.file_url:
+		frappe.cache.delete(key)
+		return None
+
+	frappe.cache.expire(key, KNOWN_FILE_TTL)
+	return file_doc
+
+
+def _store_file(file_ref, content, attached_to_doctype, attached_to_name):
+	"""Create a private File from downloaded bytes or by linking an already-stored duplicate."""
+	if isinstance(content, bytes):
+		# save_file also reuses on-disk content when the bytes hash to a known File
+		file_doc = save_file_to_disk(
+			file_ref["file_name"], content, attached_to_doctype, attached_to_name, is_private=1
+		)
+		if file_ref.get("file_unique_id"):
+			frappe.cache.set(
+				frappe.cache.make_key(f"{KNOWN_FILE_KEY}:{file_ref['file_unique_id']}"),
+				file_doc.name,
+				ex=KNOWN_FILE_TTL,
+			)
+		return file_doc
+
+	# A new File row pointing at the same file_url; File reuses the existing
+	# content by hash, and only deletes it from disk once no row references it.
+	file_doc = frappe.get_doc({
+		"doctype": "File",
+		"file_name": file_ref["file_name"],
+		"file_url": content.file_url,
+		"is_private": content.is_private,
+		"content_hash": content.content_hash,
+		"file_size": content.file_size,
+		"attached_to_doctype": attached_to_doctype or None,
+		"attached_to_name": attached_to_name or None,
+	})
+	file_doc.insert(ignore_permissions=True)
+	return file_doc
@@ -8,9 +8,16 @@ Provides four notification channels:
 4. HD Notification entries for helpdesk frontend (bell-icon alerts in helpdesk UI)
 """
 
+import json
+import time
+
 import frappe
 from frappe.utils import now_datetime, format_datetime
 
+from frappe_telegram.handlers.helpdesk_templates import render_helpdesk_template
+from frappe_telegram.handlers.telegram_api import send_message_api
+from frappe_telegram.utils.bots import get_bot_token
+
 
 def _esc(text):
 	"""Escape HTML special characters in user-controlled text."""
@@ -20,31 +27,72 @@ def _esc(text):
 # ── Ticket metadata helper ──────────────────────────────────────────
 
 
-def _get_ticket_metadata(ticket_name):
-	"""Fetch ticket metadata used across all notification templates."""
-	ticket = frappe.db.get_value(
-		"HD Ticket",
-		ticket_name,
-		["name", "subject", "status", "priority", "ticket_type", "agent_group", "raised_by", "creation"],
-		as_dict=True,
-	)
-	if not ticket:
-		return None
+def get_ticket_snapshot(ticket_name):
+	"""Fetch ticket metadata used across all notification templates.
 
-	assignments = frappe.get_all(
-		"ToDo",
-		filters={"reference_type": "HD Ticket", "reference_name": ticket_name, "status": "Open"},
-		fields=["allocated_to"],
-		limit=1,
-	)
-	ticket["assigned_agent"] = assignments[0].allocated_to if assignments else "Unassigned"
-	if ticket["assigned_agent"] != "Unassigned":
-		ticket["assigned_agent_name"] = (
-			frappe.db.get_value("User", ticket["assigned_agent"], "full_name") or ticket["assigned_agent"]
-		)
+	Ticket, open assignment and assignee name come from one joined query and
+	are memoized on ``frappe.local`` for the rest of the request or job. Call
+	``invalidate_ticket_snapshot`` after saving the ticket.
+	"""
+	cache = getattr(frappe.local, "telegram_ticket_snapshots", None)
+	if cache is None:
+		cache = frappe.local.telegram_ticket_snapshots = {}
+	if ticket_name not in cache:
+		cache[ticket_name] = _load_ticket_snapshot(ticket_name)
+	return cache[ticket_name]
+
+
+def invalidate_ticket_snapshot(ticket_name=None):
+	"""Drop the memoized snapshot of one ticket, or of all tickets."""
+	cache = getattr(frappe.local, "telegram_ticket_snapshots", None)
+	if not cache:
+		return
+	if ticket_name:
+		cache.pop(ticket_name, None)
 	else:
-		ticket["assigned_agent_name"] = "Unassigned"
+		cache.clear()
 
+
+def _load_ticket_snapshot(ticket_name):
+	Ticket = frappe.qb.DocType("HD Ticket")
+	ToDo = frappe.qb.DocType("ToDo")
+	User = frappe.qb.DocType("User")
+
+	rows = (
+		frappe.qb.from_(Ticket)
+		.left_join(ToDo)
+		.on(
+			(ToDo.reference_type == "HD Ticket")
+			& (ToDo.reference_name == Ticket.name)
+			& (ToDo.status == "Open")
+		)
+		.left_join(User)
+		.on(User.name == ToDo.allocated_to)
+		.select(
+			Ticket.name,
+			Ticket.subject,
+			Ticket.status,
+			Ticket.priority,
+			Ticket.ticket_type,
+			Ticket.agent_group,
+			Ticket.raised_by,
+			Ticket.creation,
+			ToDo.allocated_to.as_("assigned_agent"),
+			User.full_name.as_("assigned_agent_name"),
+		)
+		.where(Ticket.name == ticket_name)
+		# Newest open assignment first, as the per-field lookups returned it
+		.orderby(ToDo.creation, order=frappe.qb.desc)
+		.limit(1)
+	).run(as_dict=True)
+	if not rows:
+		return None
+
+	ticket = rows[0]
+	if ticket.assigned_agent:
+		ticket.assigned_agent_name = ticket.assigned_agent_name or ticket.assigned_agent
+	else:
+		ticket.assigned_agent = ticket.assigned_agent_name = "Unassigned"
 	return ticket
 
 
@@ -78,43 +126,117 @@ def _get_notification_settings():
 		return None
 
 
-def _get_notification_recipients(settings):
-	"""Get list of Frappe user names from the notification_recipients child table.
+RECIPIENTS_CACHE_KEY = "telegram_helpdesk_notification_recipients"
+# Bounds staleness should an invalidation ever be missed
+RECIPIENTS_CACHE_TTL = 6 * 3600
+
+
+def get_notification_recipients(settings):
+	"""Active users that receive management notifications, split by delivery.
+
+	Rows of the notification_recipients table name either a User or a Role.
+	Returns ``frappe._dict(instant=[...], digest=[...], digest_telegram=[...])``
+	of user names; a user matched by several rows gets Instant delivery if
+	any of them asks for it.
 
-	Returns user *names* (e.g. 'Administrator', 'user@example.com') which are the
-	primary key of the User doctype.  Notification Log creation needs the email
-	address (User.email) for its internal lookup, so callers that forward values to
-	``enqueue_create_notification`` must resolve names → emails first via
-	``_resolve_user_emails``.
+	The result is cached in Redis until the settings, a User's email, enabled
+	flag or roles, or anyone's Notification Settings change, and for at most
+	RECIPIENTS_CACHE_TTL seconds.
 	"""
-	recipients = []
-	for row in settings.notification_recipients or []:
-		if row.user:
-			recipients.append(row.user)
-	if not recipients:
-		recipients = ["Administrator"]
+	recipients = frappe.cache.get_value(RECIPIENTS_CACHE_KEY)
+	if recipients is None:
+		rows = _expand_recipient_rows(settings)
+		active = set(_get_active_recipients(list(rows)))
+		recipients = frappe._dict(instant=[], digest=[], digest_telegram=[])
+		for user, row in rows.items():
+			if user not in active:
+				continue
+			if row.get("delivery") == "Digest":
+				recipients.digest.append(user)
+				if row.get("digest_to_telegram"):
+					recipients.digest_telegram.append(user)
+			else:
+				recipients.instant.append(user)
+		frappe.cache.set_value(RECIPIENTS_CACHE_KEY, recipients, expires_in_sec=RECIPIENTS_CACHE_TTL)
 	return recipients
 
 
-def _resolve_user_emails(user_names):
-	"""Convert a list of User *names* to their ``email`` field values.
+def clear_notification_recipients_cache(doc=None, method=None):
+	"""Drop the cached recipient list once the current transaction commits.
+
+	Dropping it earlier would let a concurrent request cache the old list
+	again, and a rolled back save must leave it alone. Also used directly as
+	a doc event.
+	"""
+	frappe.db.after_commit.add(_delete_recipients_cache)
+
+
+def _delete_recipients_cache():
+	frappe.cache.delete_value(RECIPIENTS_CACHE_KEY)
+
+
+def on_user_update(doc, method):
+	"""Drop cached recipients when a User change can alter who is notified."""
+	before = doc.get_doc_before_save()
+	if not before:
+		return
+	roles_changed = {r.role for r in doc.get("roles")} != {r.role for r in before.get("roles")}
+	if roles_changed or doc.has_value_changed("email") or doc.has_value_changed("enabled"):
+		clear_notification_recipients_cache()
+
+
+def _expand_recipient_rows(settings):
+	"""Map each recipient user name to the table row that selected it."""
+	rows = settings.notification_recipients or []
+	by_user = {}
+
+	role_rows = {row.role: row for row in rows if not row.user and row.get("role")}
+	if role_rows:
+		for member in frappe.get_all(
+			"Has Role",
+			filters={"role": ("in", list(role_rows)), "parenttype": "User"},
+			fields=["parent", "role"],
+		):
+			_merge_recipient_row(by_user, member.parent, role_rows[member.role])
+
+	for row in rows:
+		if row.user:
+			_merge_recipient_row(by_user, row.user, row)
+
+	if not rows:
+		by_user["Administrator"] = frappe._dict(delivery="Instant")
+	return by_user
+
 
-	Frappe's ``_get_user_ids`` (used by ``enqueue_create_notification``) looks up
-	users by the ``email`` column, **not** by ``name``.  For normal users the name
-	IS the email, but for the special ``Administrator`` user the name is
-	'Administrator' while the email is something like 'admin@example.com'.
+def _merge_recipient_row(by_user, user, row):
+	# Instant delivery wins over Digest
+	current = by_user.get(user)
+	if current is None or current.get("delivery") == "Digest":
+		by_user[user] = row
 
-	Returns a deduplicated list of email strings (skipping blanks).
+
+def _get_active_recipients(user_names):
+	"""Filter User *names* down to enabled users who have not switched off
+	desk notifications in their Notification Settings.
+
+	Mirrors the checks ``make_notification_logs`` runs per user, as two
+	queries for the whole list. Returns a deduplicated list of user names.
 	"""
 	if not user_names:
 		return []
-	emails = frappe.get_all(
+	users = frappe.get_all(
 		"User",
-		filters={"name": ("in", user_names), "enabled": 1},
-		fields=["email"],
-		pluck="email",
+		filters={"name": ("in", list(set(user_names))), "enabled": 1},
+		pluck="name",
 	)
-	return list({e for e in emails if e})
+	if not users:
+		return []
+	disabled = set(frappe.get_all(
+		"Notification Settings",
+		filters={"name": ("in", users), "enabled": 0},
+		pluck="name",
+	))
+	return [u for u in users if u not in disabled]
 
 
 # ── Core notification dispatchers ────────────────────────────────────
@@ -134,288 +256,583 @@ def add_system_comment(ticket_name, content):
 		frappe.log_error(frappe.get_traceback(), "Telegram Helpdesk: system comment error")
 
 
-def send_notification_log(recipients, subject, message, ticket_name):
-	"""Create Notification Log entries for recipients.
+def fan_out_notification(users, ticket_name, subject, message, hd_message, notification_type="Mention"):
+	"""Send the Notification Log and HD Notification for one event to all users.
+
+	``users`` must already be active recipients, as returned by
+	``get_notification_recipients``. Each doctype gets a single multi-row
+	insert instead of one document insert per user.
+	"""
+	if not users:
+		return
+	_bulk_insert_notification_logs(users, subject, message, ticket_name)
+	_bulk_insert_hd_notifications(users, ticket_name, hd_message, notification_type)
 
-	Uses ``make_notification_logs`` **synchronously** so notifications appear
-	immediately without depending on background workers.
 
-	``recipients`` are User *names* (e.g. 'Administrator').  We resolve them to
-	email addresses because Frappe's internal ``_get_user_ids`` queries the User
-	``email`` column, not ``name``.
+def send_notification_log(recipients, subject, message, ticket_name):
+	"""Create Notification Log entries (desk bell icon) for recipients.
+
+	``recipients`` are User *names* (e.g. 'Administrator').
 	"""
+	_bulk_insert_notification_logs(_get_active_recipients(recipients), subject, message, ticket_name)
+
+
+def send_hd_notification(recipients, ticket_name, message, notification_type="Mention"):
+	"""Create HD Notification entries for helpdesk frontend bell icon."""
+	_bulk_insert_hd_notifications(_get_active_recipients(recipients), ticket_name, message, notification_type)
+
+
+def _bulk_insert_notification_logs(users, subject, message, ticket_name):
+	# Alert-type logs never send email, so skipping the document lifecycle
+	# only leaves the realtime ping and the unseen flag to do by hand.
+	if not users:
+		return
 	try:
-		from frappe.desk.doctype.notification_log.notification_log import make_notification_logs
-
-		emails = _resolve_user_emails(recipients)
-		if not emails:
-			return
-
-		make_notification_logs(
-			frappe._dict(
-				subject=subject,
-				type="Alert",
-				document_type="HD Ticket",
-				document_name=ticket_name,
-				from_user="Administrator",
-				email_content=message,
-			),
-			emails,
+		fields, rows = _bulk_rows(
+			users,
+			"for_user",
+			subject=subject,
+			type="Alert",
+			document_type="HD Ticket",
+			document_name=ticket_name,
+			from_user="Administrator",
+			email_content=message,
+			read=0,
 		)
+		frappe.db.bulk_insert("Notification Log", fields, rows)
+
+		NotificationSettings = frappe.qb.DocType("Notification Settings")
+		(
+			frappe.qb.update(NotificationSettings)
+			.set(NotificationSettings.seen, 0)
+			.where(NotificationSettings.name.isin(users))
+		).run()
+		for user in users:
+			frappe.publish_realtime("notification", after_commit=True, user=user)
 	except Exception:
 		frappe.log_error(frappe.get_traceback(), "Telegram Helpdesk: notification log error")
 
 
-def send_hd_notification(recipients, ticket_name, message, notification_type="Mention"):
-	"""Create HD Notification entries for helpdesk frontend bell icon."""
-	for user in recipients:
-		try:
-			frappe.get_doc(frappe._dict(
-				doctype="HD Notification",
-				user_from="Administrator",
-				user_to=user,
-				notification_type=notification_type,
-				reference_ticket=ticket_name,
-				message=message,
-			)).insert(ignore_permissions=True)
-		except Exception:
-			frappe.log_error(frappe.get_traceback(), "Telegram Helpdesk: HD notification error")
+def _bulk_insert_hd_notifications(users, ticket_name, message, notification_type):
+	if not users:
+		return
+	try:
+		fields, rows = _bulk_rows(
+			users,
+			"user_to",
+			user_from="Administrator",
+			notification_type=notification_type,
+			reference_ticket=ticket_name,
+			message=message,
+			read=0,
+		)
+		frappe.db.bulk_insert("HD Notification", fields, rows)
+		for user in users:
+			frappe.publish_realtime("helpdesk:new-notification", after_commit=True, user=user)
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Telegram Helpdesk: HD notification error")
+
+
+def _bulk_rows(users, user_field, **values):
+	"""Build (fields, rows) for ``frappe.db.bulk_insert``, one row per user."""
+	now = now_datetime()
+	owner = frappe.session.user or "Administrator"
+	fields = ["name", "owner", "modified_by", "creation", "modified", "docstatus", user_field, *values]
+	rows = [
+		(frappe.generate_hash(length=10), owner, owner, now, now, 0, user, *values.values())
+		for user in users
+	]
+	return fields, rows
 
 
 # ── High-level notification functions ────────────────────────────────
+#
+# The notify_* functions only queue an event for the ticket. Events are
+# delivered by ``flush_pending_notifications`` once the ticket has been quiet
+# for the configured coalescing window, so a burst of activity becomes a
+# single summarized comment and one notification per recipient.
+
+EVENTS_KEY = "telegram_helpdesk_notify_events"
+PENDING_KEY = "telegram_helpdesk_notify_pending"
+
+EVENT_TOGGLES = {
+	"created": "notify_on_ticket_creation",
+	"status_change": "notify_on_status_change",
+	"reopened": "notify_on_ticket_reopen",
+	"user_response": "notify_on_user_response",
+	"agent_response": "notify_on_agent_response",
+}
 
 
 def notify_ticket_created(ticket_name, telegram_user_name):
 	"""Management notification when a new ticket is created via Telegram."""
-	settings = _get_notification_settings()
-	if not settings or not getattr(settings, "notify_on_ticket_creation", 1):
-		return
+	_queue_event(ticket_name, "created", telegram_user=telegram_user_name)
 
-	ticket = _get_ticket_metadata(ticket_name)
-	if not ticket:
-		return
 
-	tg_user = _esc(_get_telegram_user_display(telegram_user_name))
-	recipients = _get_notification_recipients(settings)
-	timestamp = format_datetime(now_datetime(), "dd MMM yyyy, hh:mm a")
-
-	comment = (
-		f"<b>\U0001f3ab New Ticket Created via Telegram</b><br>"
-		f"<b>Created by:</b> {tg_user}<br>"
-		f"<b>Subject:</b> {_esc(ticket.subject)}<br>"
-		f"<b>Priority:</b> {_esc(ticket.priority) or 'Not set'}<br>"
-		f"<b>Type:</b> {_esc(ticket.ticket_type) or 'Not set'}<br>"
-		f"<b>Agent Group:</b> {_esc(ticket.agent_group) or 'Not set'}<br>"
-		f"<b>Raised by:</b> {_esc(ticket.raised_by) or 'N/A'}<br>"
-		f"<b>Time:</b> {timestamp}"
+def notify_status_change(ticket_name, old_status, new_status, actor=None):
+	"""Management notification when a ticket status changes."""
+	_queue_event(
+		ticket_name,
+		"status_change",
+		old_status=old_status,
+		new_status=new_status,
+		actor=actor or frappe.session.user or "System",
 	)
-	add_system_comment(ticket_name, comment)
 
-	subject_line = f"\U0001f3ab New Telegram Ticket #{ticket_name}: {_esc(ticket.subject)}"
-	send_notification_log(recipients, subject_line, comment, ticket_name)
-	hd_msg = f"created a new ticket via Telegram: {_esc(ticket.subject)}"
-	send_hd_notification(recipients, ticket_name, hd_msg, notification_type="Reaction")
 
+def notify_ticket_reopened(ticket_name, telegram_user_name):
+	"""Management notification when a Telegram user reopens a resolved ticket."""
+	_queue_event(ticket_name, "reopened", telegram_user=telegram_user_name)
 
-def notify_status_change(ticket_name, old_status, new_status):
-	"""Management notification when a ticket status changes."""
+
+def notify_user_response(ticket_name, telegram_user_name, message_preview):
+	"""Management notification when a Telegram user sends a follow-up message."""
+	_queue_event(ticket_name, "user_response", telegram_user=telegram_user_name, preview=_preview(message_preview))
+
+
+def notify_agent_response(ticket_name, agent_user, message_preview):
+	"""Management notification when an agent sends a reply on a Telegram ticket."""
+	_queue_event(ticket_name, "agent_response", actor=agent_user, preview=_preview(message_preview))
+
+
+def _preview(text):
+	text = text or ""
+	return (text[:200] + "...") if len(text) > 200 else text
+
+
+def _queue_event(ticket_name, event, **data):
+	"""Queue a management notification event for a ticket once the current
+	transaction commits. Per-event toggles are applied here."""
 	settings = _get_notification_settings()
-	if not settings or not getattr(settings, "notify_on_status_change", 1):
+	if not settings or not getattr(settings, EVENT_TOGGLES[event], 1):
 		return
 
-	ticket = _get_ticket_metadata(ticket_name)
-	if not ticket:
-		return
+	payload = json.dumps({"event": event, "at": str(now_datetime()), **data})
+	window = settings.get("notification_coalesce_seconds") or 0
 
-	recipients = _get_notification_recipients(settings)
-	timestamp = format_datetime(now_datetime(), "dd MMM yyyy, hh:mm a")
-	actor = frappe.session.user or "System"
-	actor_name = _esc(frappe.db.get_value("User", actor, "full_name") or actor)
-
-	comment = (
-		f"<b>\U0001f504 Status Changed</b><br>"
-		f"<b>From:</b> {_esc(old_status)} <b>\u2192 To:</b> {_esc(new_status)}<br>"
-		f"<b>Changed by:</b> {actor_name}<br>"
-		f"<b>Ticket:</b> #{ticket_name} - {_esc(ticket.subject)}<br>"
-		f"<b>Priority:</b> {_esc(ticket.priority) or 'Not set'}<br>"
-		f"<b>Assigned to:</b> {_esc(ticket.assigned_agent_name)}<br>"
-		f"<b>Time:</b> {timestamp}"
-	)
-	add_system_comment(ticket_name, comment)
+	def push():
+		frappe.cache.rpush(f"{EVENTS_KEY}:{ticket_name}", payload)
+		# Scored by the arrival of the first event of this burst
+		frappe.cache.zadd(frappe.cache.make_key(PENDING_KEY), {ticket_name: time.time()}, nx=True)
+		if not window:
+			frappe.enqueue(
+				method="frappe_telegram.handlers.helpdesk_notifications.flush_ticket_notifications",
+				queue="short",
+				ticket_name=ticket_name,
+			)
 
-	subject_line = f"\U0001f504 Ticket #{ticket_name}: {_esc(old_status)} \u2192 {_esc(new_status)}"
-	send_notification_log(recipients, subject_line, comment, ticket_name)
-	hd_msg = f"changed ticket status: {_esc(old_status)} \u2192 {_esc(new_status)}"
-	send_hd_notification(recipients, ticket_name, hd_msg, notification_type="Reaction")
+	frappe.db.after_commit.add(push)
 
 
-def notify_ticket_reopened(ticket_name, telegram_user_name):
-	"""Management notification when a Telegram user reopens a resolved ticket."""
+def flush_pending_notifications():
+	"""Scheduled job that delivers queued events of tickets whose coalescing
+	window has passed. Runs every minute via scheduler_events cron."""
 	settings = _get_notification_settings()
-	if not settings or not getattr(settings, "notify_on_ticket_reopen", 1):
+	window = (settings.get("notification_coalesce_seconds") or 0) if settings else 0
+	due = frappe.cache.zrangebyscore(frappe.cache.make_key(PENDING_KEY), 0, time.time() - window)
+	for ticket_name in due:
+		flush_ticket_notifications(frappe.safe_decode(ticket_name))
+
+
+def flush_ticket_notifications(ticket_name):
+	"""Deliver all queued events of one ticket as a single notification."""
+	events = _claim_events(ticket_name)
+	if not events:
+		return
+
+	settings = _get_notification_settings()
+	if not settings:
 		return
 
-	ticket = _get_ticket_metadata(ticket_name)
+	ticket = get_ticket_snapshot(ticket_name)
 	if not ticket:
 		return
 
-	tg_user = _esc(_get_telegram_user_display(telegram_user_name))
-	recipients = _get_notification_recipients(settings)
-	timestamp = format_datetime(now_datetime(), "dd MMM yyyy, hh:mm a")
-
-	comment = (
-		f"<b>\U0001f513 Ticket Reopened via Telegram</b><br>"
-		f"<b>Reopened by:</b> {tg_user}<br>"
-		f"<b>Ticket:</b> #{ticket_name} - {_esc(ticket.subject)}<br>"
-		f"<b>Priority:</b> {_esc(ticket.priority) or 'Not set'}<br>"
-		f"<b>Assigned to:</b> {_esc(ticket.assigned_agent_name)}<br>"
-		f"<b>Time:</b> {timestamp}"
+	try:
+		rendered = [EVENT_RENDERERS[e["event"]](ticket, e) for e in events]
+		if len(rendered) == 1:
+			notice = rendered[0]
+		else:
+			notice = _render_summary(ticket, events, rendered)
+
+		recipients = get_notification_recipients(settings)
+		add_system_comment(ticket_name, notice.comment)
+		fan_out_notification(
+			recipients.instant,
+			ticket_name,
+			notice.subject,
+			notice.comment,
+			notice.hd_msg,
+			notification_type="Reaction",
+		)
+		_buffer_digest_entries(recipients.digest, ticket, events, rendered)
+		frappe.db.commit()
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Telegram Helpdesk: notification flush error")
+
+
+def _claim_events(ticket_name):
+	"""Atomically take every queued event of a ticket off the queue."""
+	key = frappe.cache.make_key(f"{EVENTS_KEY}:{ticket_name}")
+	pipe = frappe.cache.pipeline()
+	pipe.lrange(key, 0, -1)
+	pipe.delete(key)
+	pipe.zrem(frappe.cache.make_key(PENDING_KEY), ticket_name)
+	raw_events = pipe.execute()[0]
+	return [json.loads(r) for r in raw_events]
+
+
+def _format_event_time(event):
+	return format_datetime(event["at"], "dd MMM yyyy, hh:mm a")
+
+
+def _get_user_full_name(user):
+	return _esc(frappe.db.get_value("User", user, "full_name") or user)
+
+
+def _render_ticket_created(ticket, event):
+	tg_user = _esc(_get_telegram_user_display(event["telegram_user"]))
+	return frappe._dict(
+		comment=render_helpdesk_template(
+			"Helpdesk: Ticket Created Comment",
+			ticket,
+			tg_user=tg_user,
+			time=_format_event_time(event),
+		),
+		subject=f"\U0001f3ab New Telegram Ticket #{ticket.name}: {_esc(ticket.subject)}",
+		hd_msg=f"created a new ticket via Telegram: {_esc(ticket.subject)}",
+		summary=f"\U0001f3ab Ticket created by {tg_user}",
 	)
-	add_system_comment(ticket_name, comment)
 
-	subject_line = f"\U0001f513 Ticket #{ticket_name} REOPENED by {tg_user}"
-	send_notification_log(recipients, subject_line, comment, ticket_name)
-	hd_msg = f"reopened ticket via Telegram"
-	send_hd_notification(recipients, ticket_name, hd_msg, notification_type="Reaction")
 
+def _render_status_change(ticket, event):
+	old_status, new_status = _esc(event["old_status"]), _esc(event["new_status"])
+	actor_name = _get_user_full_name(event["actor"])
+	return frappe._dict(
+		comment=render_helpdesk_template(
+			"Helpdesk: Status Change Comment",
+			ticket,
+			old_status=old_status,
+			new_status=new_status,
+			actor_name=actor_name,
+			time=_format_event_time(event),
+		),
+		subject=f"\U0001f504 Ticket #{ticket.name}: {old_status} \u2192 {new_status}",
+		hd_msg=f"changed ticket status: {old_status} \u2192 {new_status}",
+		summary=f"\U0001f504 {actor_name} changed status: {old_status} \u2192 {new_status}",
+	)
 
-def notify_user_response(ticket_name, telegram_user_name, message_preview):
-	"""Management notification when a Telegram user sends a follow-up message."""
-	settings = _get_notification_settings()
-	if not settings or not getattr(settings, "notify_on_user_response", 1):
-		return
 
-	ticket = _get_ticket_metadata(ticket_name)
-	if not ticket:
-		return
+def _render_ticket_reopened(ticket, event):
+	tg_user = _esc(_get_telegram_user_display(event["telegram_user"]))
+	return frappe._dict(
+		comment=render_helpdesk_template(
+			"Helpdesk: Ticket Reopened Comment",
+			ticket,
+			tg_user=tg_user,
+			time=_format_event_time(event),
+		),
+		subject=f"\U0001f513 Ticket #{ticket.name} REOPENED by {tg_user}",
+		hd_msg="reopened ticket via Telegram",
+		summary=f"\U0001f513 Reopened by {tg_user}",
+	)
 
-	tg_user = _esc(_get_telegram_user_display(telegram_user_name))
-	recipients = _get_notification_recipients(settings)
-	timestamp = format_datetime(now_datetime(), "dd MMM yyyy, hh:mm a")
-	preview = (message_preview[:200] + "...") if len(message_preview) > 200 else message_preview
-
-	comment = (
-		f"<b>\U0001f4ac Customer Response via Telegram</b><br>"
-		f"<b>From:</b> {tg_user}<br>"
-		f"<b>Ticket:</b> #{ticket_name} - {_esc(ticket.subject)}<br>"
-		f"<b>Status:</b> {_esc(ticket.status)} | <b>Assigned to:</b> {_esc(ticket.assigned_agent_name)}<br>"
-		f"<b>Message:</b> {_esc(preview)}<br>"
-		f"<b>Time:</b> {timestamp}"
+
+def _render_user_response(ticket, event):
+	tg_user = _esc(_get_telegram_user_display(event["telegram_user"]))
+	return frappe._dict(
+		comment=render_helpdesk_template(
+			"Helpdesk: Customer Response Comment",
+			ticket,
+			tg_user=tg_user,
+			preview=_esc(event["preview"]),
+			time=_format_event_time(event),
+		),
+		subject=f"\U0001f4ac Customer response on Ticket #{ticket.name} from {tg_user}",
+		hd_msg="sent a follow-up message via Telegram",
+		summary=f"\U0001f4ac {tg_user}: {_esc(event['preview'])}",
 	)
-	add_system_comment(ticket_name, comment)
 
-	subject_line = f"\U0001f4ac Customer response on Ticket #{ticket_name} from {tg_user}"
-	send_notification_log(recipients, subject_line, comment, ticket_name)
-	hd_msg = f"sent a follow-up message via Telegram"
-	send_hd_notification(recipients, ticket_name, hd_msg, notification_type="Reaction")
 
+def _render_agent_response(ticket, event):
+	agent_name = _get_user_full_name(event["actor"])
+	return frappe._dict(
+		comment=render_helpdesk_template(
+			"Helpdesk: Agent Response Comment",
+			ticket,
+			actor_name=agent_name,
+			preview=_esc(event["preview"]),
+			time=_format_event_time(event),
+		),
+		subject=f"\U0001f468\u200d\U0001f4bc Agent {agent_name} replied on Ticket #{ticket.name}",
+		hd_msg="replied on Telegram ticket",
+		summary=f"\U0001f468\u200d\U0001f4bc {agent_name} replied: {_esc(event['preview'])}",
+	)
 
-def notify_agent_response(ticket_name, agent_user, message_preview):
-	"""Management notification when an agent sends a reply on a Telegram ticket."""
+
+EVENT_RENDERERS = {
+	"created": _render_ticket_created,
+	"status_change": _render_status_change,
+	"reopened": _render_ticket_reopened,
+	"user_response": _render_user_response,
+	"agent_response": _render_agent_response,
+}
+
+
+def _render_summary(ticket, events, rendered):
+	lines = "<br>".join(
+		f"<b>{_format_event_time(event)}</b> — {notice.summary}"
+		for event, notice in zip(events, rendered)
+	)
+	return frappe._dict(
+		comment=(
+			f"<b>\U0001f514 {len(events)} Telegram updates</b><br>"
+			f"<b>Ticket:</b> #{ticket.name} - {_esc(ticket.subject)}<br>"
+			f"<b>Status:</b> {_esc(ticket.status)} | <b>Assigned to:</b> {_esc(ticket.assigned_agent_name)}<br>"
+			f"{lines}"
+		),
+		subject=f"\U0001f514 {len(events)} updates on Ticket #{ticket.name}: {_esc(ticket.subject)}",
+		hd_msg=f"posted {len(events)} updates on a Telegram ticket",
+	)
+
+
+# ── Digest delivery ──────────────────────────────────────────────────
+#
+# Recipients set to Digest get a compact line per event appended to their
+# own Redis list. ``flush_notification_digests`` turns each list into one
+# Notification Log (and optionally one Telegram message) per interval.
+
+DIGEST_KEY = "telegram_helpdesk_digest"
+DIGEST_USERS_KEY = "telegram_helpdesk_digest_users"
+DIGEST_GATE_KEY = "telegram_helpdesk_digest_gate"
+DIGEST_MAX_ENTRIES = 500
+TELEGRAM_TEXT_LIMIT = 4000
+
+
+def _buffer_digest_entries(users, ticket, events, rendered):
+	if not users:
+		return
+	entries = [
+		json.dumps({"t": ticket.name, "s": ticket.subject, "at": e["at"], "l": notice.summary})
+		for e, notice in zip(events, rendered)
+	]
+	pipe = frappe.cache.pipeline()
+	for user in users:
+		key = frappe.cache.make_key(f"{DIGEST_KEY}:{user}")
+		pipe.rpush(key, *entries)
+		pipe.ltrim(key, -DIGEST_MAX_ENTRIES, -1)
+	pipe.sadd(frappe.cache.make_key(DIGEST_USERS_KEY), *users)
+	pipe.execute()
+
+
+def flush_notification_digests():
+	"""Scheduled job that delivers buffered digests every digest interval.
+
+	Runs every minute via scheduler_events cron; an expiring Redis gate lets
+	only one run per interval through.
+	"""
 	settings = _get_notification_settings()
-	if not settings or not getattr(settings, "notify_on_agent_response", 1):
+	if not settings:
 		return
 
-	ticket = _get_ticket_metadata(ticket_name)
-	if not ticket:
+	interval = (settings.get("digest_interval_minutes") or 60) * 60
+	if not frappe.cache.set(frappe.cache.make_key(DIGEST_GATE_KEY), 1, nx=True, ex=interval):
 		return
 
-	recipients = _get_notification_recipients(settings)
-	timestamp = format_datetime(now_datetime(), "dd MMM yyyy, hh:mm a")
-	preview = (message_preview[:200] + "...") if len(message_preview) > 200 else message_preview
-	agent_name = _esc(frappe.db.get_value("User", agent_user, "full_name") or agent_user)
-
-	comment = (
-		f"<b>\U0001f468\u200d\U0001f4bc Agent Response Sent to Telegram</b><br>"
-		f"<b>Agent:</b> {agent_name}<br>"
-		f"<b>Ticket:</b> #{ticket_name} - {_esc(ticket.subject)}<br>"
-		f"<b>Status:</b> {_esc(ticket.status)}<br>"
-		f"<b>Response:</b> {_esc(preview)}<br>"
-		f"<b>Time:</b> {timestamp}"
+	digests = {}
+	for user in frappe.cache.smembers(DIGEST_USERS_KEY):
+		user = frappe.safe_decode(user)
+		entries = _claim_digest(user)
+		if entries:
+			digests[user] = entries
+	if not digests:
+		return
+
+	try:
+		_insert_digest_logs(digests)
+		frappe.db.commit()
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Telegram Helpdesk: digest error")
+		return
+
+	telegram_users = set(get_notification_recipients(settings).digest_telegram) & set(digests)
+	if telegram_users:
+		_send_digests_to_telegram(settings, {u: digests[u] for u in telegram_users})
+
+
+def _claim_digest(user):
+	key = frappe.cache.make_key(f"{DIGEST_KEY}:{user}")
+	pipe = frappe.cache.pipeline()
+	pipe.lrange(key, 0, -1)
+	pipe.delete(key)
+	pipe.srem(frappe.cache.make_key(DIGEST_USERS_KEY), user)
+	return [frappe._dict(json.loads(r)) for r in pipe.execute()[0]]
+
+
+def _group_digest(entries):
+	"""Return ``{ticket: (subject, [entries])}`` in order of first appearance."""
+	tickets = {}
+	for entry in entries:
+		tickets.setdefault(entry.t, (entry.s, []))[1].append(entry)
+	return tickets
+
+
+def _render_digest(entries, line_break):
+	parts = []
+	for ticket_name, (subject, ticket_entries) in _group_digest(entries).items():
+		parts.append(f"<b>#{ticket_name} - {_esc(subject)}</b>")
+		parts.extend(
+			f"{format_datetime(e.at, 'dd MMM, hh:mm a')} — {e.l}" for e in ticket_entries
+		)
+		parts.append("")
+	return line_break.join(parts).strip()
+
+
+def _digest_subject(entries):
+	tickets = len({e.t for e in entries})
+	return (
+		f"\U0001f4cb Telegram helpdesk digest: {len(entries)} update{'s' if len(entries) != 1 else ''} "
+		f"on {tickets} ticket{'s' if tickets != 1 else ''}"
+	)
+
+
+def _insert_digest_logs(digests):
+	now = now_datetime()
+	owner = frappe.session.user or "Administrator"
+	rows = []
+	for user, entries in digests.items():
+		tickets = {e.t for e in entries}
+		rows.append((
+			frappe.generate_hash(length=10), owner, owner, now, now, 0,
+			user, _digest_subject(entries), "Alert", "HD Ticket",
+			tickets.pop() if len(tickets) == 1 else None,
+			"Administrator", _render_digest(entries, "<br>"), 0,
+		))
+	frappe.db.bulk_insert(
+		"Notification Log",
+		[
+			"name", "owner", "modified_by", "creation", "modified", "docstatus",
+			"for_user", "subject", "type", "document_type",
+			"document_name", "from_user", "email_content", "read",
+		],
+		rows,
 	)
-	add_system_comment(ticket_name, comment)
 
-	subject_line = f"\U0001f468\u200d\U0001f4bc Agent {agent_name} replied on Ticket #{ticket_name}"
-	send_notification_log(recipients, subject_line, comment, ticket_name)
-	hd_msg = f"replied on Telegram ticket"
-	send_hd_notification(recipients, ticket_name, hd_msg, notification_type="Reaction")
+	NotificationSettings = frappe.qb.DocType("Notification Settings")
+	(
+		frappe.qb.update(NotificationSettings)
+		.set(NotificationSettings.seen, 0)
+		.where(NotificationSettings.name.isin(list(digests)))
+	).run()
+	for user in digests:
+		frappe.publish_realtime("notification", after_commit=True, user=user)
+
+
+def _send_digests_to_telegram(settings, digests):
+	chat_ids = {
+		row.user: row.telegram_user_id
+		for row in frappe.get_all(
+			"Telegram User",
+			filters={"user": ("in", list(digests))},
+			fields=["user", "telegram_user_id"],
+		)
+		if row.telegram_user_id
+	}
+	if not chat_ids:
+		return
+
+	token = get_bot_token(settings.bot)
+	if not token:
+		return
+
+	for user, chat_id in chat_ids.items():
+		entries = digests[user]
+		body = _render_digest(entries, "\n")
+		text = f"<b>{_digest_subject(entries)}</b>\n\n{body}"
+		if len(text) > TELEGRAM_TEXT_LIMIT:
+			text = text[:TELEGRAM_TEXT_LIMIT].rsplit("\n", 1)[0] + "\n…"
+		send_message_api(chat_id, token, text, parse_mode="HTML")
 
 
 # ── Rich Telegram message builders (HTML) ────────────────────────────
 
 
-def build_rich_status_resolved_message(ticket_name):
+def get_recipient_language(ticket_name):
+	"""Language of the site user behind the ticket's Telegram customer, or None.
+
+	Guests and users without a language get the default template.
+	"""
+	Mapping = frappe.qb.DocType("Helpdesk Telegram Ticket")
+	TelegramUser = frappe.qb.DocType("Telegram User")
+	User = frappe.qb.DocType("User")
+
+	languages = (
+		frappe.qb.from_(Mapping)
+		.join(TelegramUser)
+		.on(TelegramUser.name == Mapping.telegram_user)
+		.join(User)
+		.on(User.name == TelegramUser.user)
+		.select(User.language)
+		.where(Mapping.ticket == ticket_name)
+		.orderby(Mapping.creation, order=frappe.qb.desc)
+		.limit(1)
+	).run(pluck=True)
+	return languages[0] if languages else None
+
+
+def build_rich_status_resolved_message(ticket_name, lang=None):
 	"""Rich Telegram message for status resolved."""
-	ticket = _get_ticket_metadata(ticket_name)
+	ticket = get_ticket_snapshot(ticket_name)
 	if not ticket:
 		return f"\u2705 Your ticket #{ticket_name} has been resolved."
 
-	return (
-		f"\u2705 <b>Ticket Resolved</b>\n\n"
-		f"\U0001f3ab <b>Ticket:</b> #{ticket_name}\n"
-		f"\U0001f4cb <b>Subject:</b> {_esc(ticket.subject)}\n"
-		f"\U0001f4ca <b>Priority:</b> {_esc(ticket.priority) or 'Standard'}\n"
-		f"\U0001f464 <b>Handled by:</b> {_esc(ticket.assigned_agent_name)}\n\n"
-		f"\U0001f44d Thank you for contacting support! If you need further assistance, "
-		f"you can reopen this ticket or create a new one."
-	)
+	return render_helpdesk_template("Helpdesk: Ticket Resolved", ticket, lang=lang)
 
 
-def build_rich_status_reopened_message(ticket_name):
+def build_rich_status_reopened_message(ticket_name, lang=None):
 	"""Rich Telegram message for status reopened."""
-	ticket = _get_ticket_metadata(ticket_name)
+	ticket = get_ticket_snapshot(ticket_name)
 	if not ticket:
 		return f"\U0001f504 Your ticket #{ticket_name} has been reopened. You can send follow-up messages."
 
-	return (
-		f"\U0001f504 <b>Ticket Reopened</b>\n\n"
-		f"\U0001f3ab <b>Ticket:</b> #{ticket_name}\n"
-		f"\U0001f4cb <b>Subject:</b> {_esc(ticket.subject)}\n"
-		f"\U0001f7e2 <b>Status:</b> Re-Open\n\n"
-		f"\U0001f4ac Your ticket has been reopened. You can now send follow-up messages."
-	)
+	return render_helpdesk_template("Helpdesk: Ticket Reopened", ticket, lang=lang)
 
 
-def build_rich_status_update_message(ticket_name, new_status):
+def build_rich_status_update_message(ticket_name, new_status, lang=None):
 	"""Rich Telegram message for generic status updates."""
-	ticket = _get_ticket_metadata(ticket_name)
+	ticket = get_ticket_snapshot(ticket_name)
 	if not ticket:
 		return f"\U0001f4e2 Your ticket #{ticket_name} status has been updated to: {new_status}"
 
-	return (
-		f"\U0001f4e2 <b>Ticket Status Update</b>\n\n"
-		f"\U0001f3ab <b>Ticket:</b> #{ticket_name}\n"
-		f"\U0001f4cb <b>Subject:</b> {_esc(ticket.subject)}\n"
-		f"\U0001f195 <b>New Status:</b> {_esc(new_status)}\n"
-		f"\U0001f4ca <b>Priority:</b> {_esc(ticket.priority) or 'Standard'}\n"
-		f"\U0001f464 <b>Assigned to:</b> {_esc(ticket.assigned_agent_name)}"
-	)
+	return render_helpdesk_template("Helpdesk: Status Update", ticket, lang=lang, new_status=_esc(new_status))
 
 
-def build_rich_agent_reply_message(ticket_name, plain_text):
-	"""Rich Telegram message for agent replies."""
-	ticket = _get_ticket_metadata(ticket_name)
+def build_rich_agent_reply_message(ticket_name, message_html, lang=None):
+	"""Rich Telegram message for agent replies.
+
+	``message_html`` must already be Telegram HTML, as produced by
+	``html_to_telegram_html``; it is inserted without further escaping.
+	"""
+	ticket = get_ticket_snapshot(ticket_name)
 	if not ticket:
-		return f"\U0001f4e9 Reply on Ticket #{ticket_name}:\n\n{_esc(plain_text)}"
+		return f"\U0001f4e9 Reply on Ticket #{ticket_name}:\n\n{message_html}"
+
+	return render_helpdesk_template("Helpdesk: Agent Reply", ticket, lang=lang, message=message_html)
 
-	return (
-		f"\U0001f4e9 <b>Agent Reply</b>\n\n"
-		f"\U0001f3ab <b>Ticket:</b> #{ticket_name} - {_esc(ticket.subject)}\n"
-		f"\U0001f464 <b>From:</b> {_esc(ticket.assigned_agent_name)}\n\n"
-		f"{_esc(plain_text)}"
-	)
+
+def build_rich_ticket_details_message(ticket_name, lang=None):
+	"""Rich Telegram message with a ticket's current details (My Tickets quick action)."""
+	ticket = get_ticket_snapshot(ticket_name)
+	if not ticket:
+		return f"\U0001f3ab Ticket #{ticket_name}"
+
+	return render_helpdesk_template("Helpdesk: Ticket Details", ticket, lang=lang)
 
 
-def build_rich_followup_confirmation(ticket_name):
+def build_rich_followup_confirmation(ticket_name, lang=None):
 	"""Rich Telegram message confirming follow-up message was added."""
-	ticket = _get_ticket_metadata(ticket_name)
+	ticket = get_ticket_snapshot(ticket_name)
 	if not ticket:
 		return f"\u2705 Message added to ticket #{ticket_name}"
 
-	return (
-		f"\u2705 <b>Message Sent</b>\n\n"
-		f"\U0001f3ab <b>Ticket:</b> #{ticket_name}\n"
-		f"\U0001f4cb <b>Subject:</b> {_esc(ticket.subject)}\n"
-		f"\U0001f4c8 <b>Status:</b> {_esc(ticket.status)}\n\n"
-		f"\U0001f552 Your message has been added. An agent will review it shortly."
-	)
+	return render_helpdesk_template("Helpdesk: Follow-up Confirmation", ticket, lang=lang)
@@ -1,8 +1,87 @@
+"""
+Doc events that relay helpdesk activity on Telegram tickets to the customer.
+
+The hooks run inside the agent's save request, so they only capture a small
+payload and push it to a per-ticket Redis outbox once the transaction
+commits. ``deliver_outbox`` then talks to Telegram in a background job,
+draining each ticket's outbox in order under a per-ticket lock, so a reply
+never overtakes the status change saved before it.
+
+Most Communications and Files in a helpdesk have nothing to do with
+Telegram, so the hooks first consult a Redis set of Telegram-mapped tickets
+and return without touching the database when there is no match. Redis only
+speeds the answer up: anything missing from it is read from the database.
+The exception is File hooks, which are too frequent for that: a reply's
+Communication is recorded in Redis when it is inserted (and warmed on
+migrate), and a file whose Communication is not recorded is ignored.
+
+A reply's attachments are forwarded together: every File hook for the same
+Communication collapses into one outbox item, which waits for the set of
+files to settle and sends them as a single media group. Forwarded files are
+recorded in Helpdesk Telegram Forwarded File, so retries and repeated hooks
+never send a file twice.
+
+Status changes made in bulk (data import, patches, background jobs, list
+view bulk edits) skip the per-ticket work entirely: the hook buffers the change in Redis and
+one ``process_bulk_status_changes`` job handles the whole batch with
+set-based queries. Its messages still go through each ticket's outbox.
+"""
+
+import json
 import os
+import time
 
 import frappe
-
-from frappe_telegram.handlers.telegram_api import send_document_api, send_message_api
+from frappe.utils import add_to_date, now_datetime
+
+from frappe_telegram.handlers.telegram_api import (
+	send_document_api,
+	send_media_group_api,
+	send_message_api,
+)
+from frappe_telegram.utils.bots import get_helpdesk_bot_token
+from frappe_telegram.utils.formatting import html_to_telegram_html, html_to_text
+
+OUTBOX_KEY = "telegram_helpdesk_outbox"
+OUTBOX_LOCK_TTL = 300
+# Outbox items rendered from a template, in the customer's language
+TRANSLATED_KINDS = ("agent_reply", "resolved", "reopened", "status_update")
+
+# Every ticket with a Helpdesk Telegram Ticket mapping, plus a sentinel that
+# proves the set is complete (a rebuilt or evicted set lacks it)
+MAPPED_TICKETS_KEY = "telegram_helpdesk_mapped_tickets"
+MAPPED_TICKETS_SENTINEL = "__complete__"
+
+# Sent Communications on Telegram tickets, remembered long enough for the
+# reply's attachments to be linked to them
+TELEGRAM_COMMUNICATION_KEY = "telegram_helpdesk_communication"
+TELEGRAM_COMMUNICATION_TTL = 7 * 24 * 3600
+
+# At most one pending attachments delivery per Communication; the key is
+# cleared when delivery starts, so files linked later queue another one
+ATTACHMENTS_QUEUED_KEY = "telegram_helpdesk_attachments_queued"
+
+# Files of one reply are often linked by separate requests; wait this long
+# after the first one before collecting them
+ATTACHMENTS_SETTLE_SECONDS = 5
+
+# Telegram albums hold 2-10 items
+MEDIA_GROUP_SIZE = 10
+
+# Status changes buffered for process_bulk_status_changes, and the flag that
+# keeps a single job queued for them
+BULK_STATUS_KEY = "telegram_helpdesk_bulk_status_changes"
+BULK_STATUS_QUEUED_KEY = "telegram_helpdesk_bulk_status_queued"
+BULK_STATUS_BATCH_SIZE = 500
+
+# List view bulk edits: small ones run in the request, large ones as a job
+BULK_UPDATE_METHODS = {
+	"frappe.desk.doctype.bulk_update.bulk_update.submit_cancel_or_update_docs",
+	"frappe.desk.doctype.bulk_update.bulk_update._bulk_action",
+}
+
+# Stays below Telegram's limit of 30 messages per second per bot
+BULK_SEND_INTERVAL = 1 / 25
 
 
 def on_communication_insert(doc, method):
@@ -11,31 +90,35 @@ def on_communication_insert(doc, method):
 		return
 	if doc.reference_doctype != "HD Ticket":
 		return
+	if not is_telegram_ticket(doc.reference_name):
+		return
 
-	target = _get_telegram_target_for_ticket(doc.reference_name)
-	if not target:
+	chat_id = _get_telegram_chat_for_ticket(doc.reference_name)
+	if not chat_id:
 		return
 
-	chat_id, token = target
+	# Lets on_file_insert recognise this reply's attachments without reading
+	# the Communication back
+	frappe.cache.set(
+		frappe.cache.make_key(f"{TELEGRAM_COMMUNICATION_KEY}:{doc.name}"),
+		doc.reference_name,
+		ex=TELEGRAM_COMMUNICATION_TTL,
+	)
 
-	# Strip HTML from content
-	plain_text = strip_html(doc.content or "")
+	# Keep the editor's formatting in the subset Telegram supports
+	message_html = html_to_telegram_html(doc.content or "")
 
-	if plain_text.strip():
-		from frappe_telegram.handlers.helpdesk_notifications import (
-			build_rich_agent_reply_message,
-			notify_agent_response,
-		)
+	if message_html:
+		from frappe_telegram.handlers.helpdesk_notifications import notify_agent_response
 
 		# Rich Telegram message to user
-		msg = build_rich_agent_reply_message(doc.reference_name, plain_text)
-		send_message_api(chat_id, token, msg, parse_mode="HTML")
+		_queue_delivery(doc.reference_name, {"kind": "agent_reply", "chat_id": chat_id, "html": message_html})
 
 		# Management notifications (system comment + notification log)
 		notify_agent_response(
 			doc.reference_name,
 			doc.sender or frappe.session.user,
-			plain_text,
+			strip_html(doc.content or ""),
 		)
 
 
@@ -50,23 +133,26 @@ def on_file_insert(doc, method):
 	if doc.attached_to_doctype != "Communication":
 		return
 
-	comm = frappe.db.get_value(
-		"Communication",
-		doc.attached_to_name,
-		["sent_or_received", "reference_doctype", "reference_name"],
-		as_dict=True,
-	)
-	if not comm or comm.sent_or_received != "Sent" or comm.reference_doctype != "HD Ticket":
+	ticket_name = _get_telegram_ticket_for_communication(doc.attached_to_name)
+	if not ticket_name:
 		return
 
-	ticket_name = comm.reference_name
-
-	target = _get_telegram_target_for_ticket(ticket_name)
-	if not target:
+	chat_id = _get_telegram_chat_for_ticket(ticket_name)
+	if not chat_id:
 		return
 
-	chat_id, token = target
-	_send_file_doc(doc, chat_id, token)
+	# The delivery collects all of the Communication's files itself, so
+	# only the first File hook of a reply needs to queue it
+	_queue_delivery(
+		ticket_name,
+		{
+			"kind": "attachments",
+			"chat_id": chat_id,
+			"communication": doc.attached_to_name,
+			"queued_at": time.time(),
+		},
+		once_key=f"{ATTACHMENTS_QUEUED_KEY}:{doc.attached_to_name}",
+	)
 
 
 def on_file_update(doc, method):
@@ -84,12 +170,24 @@ def on_file_update(doc, method):
 
 def on_ticket_update(doc, method):
 	"""Notify Telegram user of ticket status changes and manage mapping lifecycle."""
+	from frappe_telegram.handlers.helpdesk_notifications import invalidate_ticket_snapshot
+
+	# Any save makes the memoized notification snapshot stale
+	invalidate_ticket_snapshot(doc.name)
+
 	if not doc.has_value_changed("status"):
 		return
 
 	if getattr(doc.flags, "skip_telegram_notify", False):
 		return
 
+	if not is_telegram_ticket(doc.name):
+		return
+
+	if _in_bulk_context():
+		_queue_bulk_status_change(doc)
+		return
+
 	mapping = frappe.db.get_value(
 		"Helpdesk Telegram Ticket",
 		{"ticket": doc.name},
@@ -100,25 +198,14 @@ def on_ticket_update(doc, method):
 	if not mapping:
 		return
 
-	try:
-		settings = frappe.get_cached_doc("Helpdesk Telegram Settings")
-		if not settings.enabled or not settings.bot:
-			return
-		bot_doc = frappe.get_doc("Telegram Bot", settings.bot)
-		token = bot_doc.get_password("api_token")
-	except Exception:
+	if not _is_helpdesk_bot_enabled():
 		return
 
 	chat_id = frappe.db.get_value("Telegram Chat", mapping.telegram_chat, "chat_id")
 	if not chat_id:
 		return
 
-	from frappe_telegram.handlers.helpdesk_notifications import (
-		build_rich_status_resolved_message,
-		build_rich_status_reopened_message,
-		build_rich_status_update_message,
-		notify_status_change,
-	)
+	from frappe_telegram.handlers.helpdesk_notifications import notify_status_change
 
 	prev = doc.get_doc_before_save()
 	old_status = getattr(prev, "status", "Unknown") if prev else "Unknown"
@@ -130,24 +217,15 @@ def on_ticket_update(doc, method):
 	if status_category == "Resolved":
 		if mapping.is_open:
 			frappe.db.set_value("Helpdesk Telegram Ticket", mapping.name, "is_open", 0)
-		keyboard = {
-			"inline_keyboard": [
-				[{"text": "\u2705 Reopen Ticket", "callback_data": f"reopen_ticket_{doc.name}"}],
-				[{"text": "\U0001f3ab Create New Ticket", "callback_data": "create_ticket"}],
-			]
-		}
-		msg = build_rich_status_resolved_message(doc.name)
-		send_message_api(chat_id, token, msg, reply_markup=keyboard, parse_mode="HTML")
+		_queue_delivery(doc.name, {"kind": "resolved", "chat_id": chat_id})
 
 	elif status_category == "Open" and not mapping.is_open:
 		frappe.db.set_value("Helpdesk Telegram Ticket", mapping.name, "is_open", 1)
-		msg = build_rich_status_reopened_message(doc.name)
-		send_message_api(chat_id, token, msg, parse_mode="HTML")
+		_queue_delivery(doc.name, {"kind": "reopened", "chat_id": chat_id})
 
 	else:
 		if mapping.is_open:
-			msg = build_rich_status_update_message(doc.name, doc.status)
-			send_message_api(chat_id, token, msg, parse_mode="HTML")
+			_queue_delivery(doc.name, {"kind": "status_update", "chat_id": chat_id, "status": doc.status})
 
 	# Management notification for all status changes
 	notify_status_change(doc.name, old_status, doc.status)
@@ -155,50 +233,442 @@ def on_ticket_update(doc, method):
 
 # --- Helpers ---
 
-def _get_telegram_target_for_ticket(ticket_name):
-	"""Return (chat_id, token) for a Telegram-mapped ticket, or None."""
+def is_telegram_ticket(ticket_name):
+	"""Whether an HD Ticket has a Telegram mapping, answered from Redis.
+
+	False positives are possible (a mapping whose insert rolled back), so
+	callers still read the mapping itself; false negatives are not.
+	"""
+	key = frappe.cache.make_key(MAPPED_TICKETS_KEY)
+	pipe = frappe.cache.pipeline()
+	pipe.sismember(key, ticket_name)
+	pipe.sismember(key, MAPPED_TICKETS_SENTINEL)
+	is_member, is_complete = pipe.execute()
+	if is_member:
+		return True
+	if is_complete:
+		return False
+
+	_rebuild_mapped_tickets()
+	return bool(frappe.cache.sismember(MAPPED_TICKETS_KEY, ticket_name))
+
+
+def add_telegram_ticket(ticket_name):
+	frappe.cache.sadd(MAPPED_TICKETS_KEY, ticket_name)
+
+
+def remove_telegram_ticket(ticket_name):
+	frappe.cache.srem(MAPPED_TICKETS_KEY, ticket_name)
+
+
+def _rebuild_mapped_tickets():
+	# Adding (never replacing) keeps members added concurrently by new mappings
+	tickets = frappe.get_all("Helpdesk Telegram Ticket", distinct=True, pluck="ticket")
+	frappe.cache.sadd(
+		MAPPED_TICKETS_KEY,
+		*[t for t in tickets if t],
+		MAPPED_TICKETS_SENTINEL,
+	)
+
+
+def _get_telegram_ticket_for_communication(communication):
+	"""The Telegram-mapped HD Ticket a Sent Communication replies on, or None.
+
+	Answered from Redis alone, so files on ordinary emails cost no query.
+	Replies are recorded by on_communication_insert and warmed on migrate.
+	"""
+	ticket_name = frappe.cache.get(frappe.cache.make_key(f"{TELEGRAM_COMMUNICATION_KEY}:{communication}"))
+	return frappe.safe_decode(ticket_name) if ticket_name else None
+
+
+def warm_telegram_communications():
+	"""Record the recent Sent Communications of Telegram-mapped tickets in Redis.
+
+	Called on migrate, so replies sent before their key existed (or before a
+	Redis flush) still have their late-linked attachments forwarded.
+	"""
+	Communication = frappe.qb.DocType("Communication")
+	Mapping = frappe.qb.DocType("Helpdesk Telegram Ticket")
+	since = add_to_date(now_datetime(), seconds=-TELEGRAM_COMMUNICATION_TTL)
+
+	rows = (
+		frappe.qb.from_(Communication)
+		.select(Communication.name, Communication.reference_name)
+		.where(Communication.sent_or_received == "Sent")
+		.where(Communication.reference_doctype == "HD Ticket")
+		.where(Communication.creation >= since)
+		.where(Communication.reference_name.isin(frappe.qb.from_(Mapping).select(Mapping.ticket)))
+	).run(as_dict=True)
+	if not rows:
+		return
+
+	pipe = frappe.cache.pipeline()
+	for row in rows:
+		pipe.set(
+			frappe.cache.make_key(f"{TELEGRAM_COMMUNICATION_KEY}:{row.name}"),
+			row.reference_name,
+			ex=TELEGRAM_COMMUNICATION_TTL,
+		)
+	pipe.execute()
+
+
+def _get_telegram_chat_for_ticket(ticket_name):
+	"""Return the Telegram chat_id of an open Telegram-mapped ticket, or None."""
 	mapping = frappe.db.get_value(
 		"Helpdesk Telegram Ticket",
 		{"ticket": ticket_name, "is_open": 1},
 		"telegram_chat",
 	)
-	if not mapping:
+	if not mapping or not _is_helpdesk_bot_enabled():
 		return None
 
+	return frappe.db.get_value("Telegram Chat", mapping, "chat_id")
+
+
+def _is_helpdesk_bot_enabled():
 	try:
 		settings = frappe.get_cached_doc("Helpdesk Telegram Settings")
-		if not settings.enabled or not settings.bot:
-			return None
-		bot_doc = frappe.get_doc("Telegram Bot", settings.bot)
-		token = bot_doc.get_password("api_token")
 	except Exception:
-		return None
+		return False
+	return bool(settings.enabled and settings.bot)
 
-	chat_id = frappe.db.get_value("Telegram Chat", mapping, "chat_id")
-	if not chat_id:
-		return None
 
-	return chat_id, token
+# --- Bulk status changes ---
 
+def _in_bulk_context():
+	"""Whether the current status change is one of many saved together."""
+	if frappe.flags.in_import or frappe.flags.in_patch or frappe.flags.in_migrate:
+		return True
 
-def _send_file_doc(file_doc, chat_id, token):
-	"""Resolve a File doc's path on disk and send it to a Telegram chat."""
-	file_url = file_doc.get("file_url") if hasattr(file_doc, "get") else file_doc.file_url
-	file_name = file_doc.get("file_name") if hasattr(file_doc, "get") else file_doc.file_name
-	if not file_url or "/files/" not in file_url:
+	# Anything saved from a background job, large bulk edits included
+	if getattr(frappe.local, "job", None):
+		return True
+
+	return frappe.form_dict.get("cmd") in BULK_UPDATE_METHODS
+
+
+def _queue_bulk_status_change(doc):
+	"""Buffer a status change for ``process_bulk_status_changes`` once the
+	current transaction commits, queueing the job if none is pending."""
+	prev = doc.get_doc_before_save()
+	payload = json.dumps({
+		"ticket": doc.name,
+		"old_status": getattr(prev, "status", "Unknown") if prev else "Unknown",
+		"new_status": doc.status,
+		"status_category": doc.status_category,
+		"actor": frappe.session.user,
+	})
+
+	def push():
+		frappe.cache.rpush(BULK_STATUS_KEY, payload)
+		if frappe.cache.set(
+			frappe.cache.make_key(BULK_STATUS_QUEUED_KEY), 1, nx=True, ex=OUTBOX_LOCK_TTL
+		):
+			frappe.enqueue(
+				method="frappe_telegram.handlers.helpdesk_reply.process_bulk_status_changes",
+				queue="short",
+			)
+
+	frappe.db.after_commit.add(push)
+
+
+def process_bulk_status_changes():
+	"""Background job that relays buffered status changes in batches.
+
+	Changes pushed after the job started queue another job, so nothing is
+	left behind when the queued flag is cleared.
+	"""
+	frappe.cache.delete_value(BULK_STATUS_QUEUED_KEY)
+	while True:
+		changes = _claim_bulk_status_changes()
+		if not changes:
+			break
+		try:
+			_process_status_batch(changes)
+		except Exception:
+			frappe.db.rollback()
+			frappe.log_error(frappe.get_traceback(), "Telegram Helpdesk: bulk status changes")
+
+
+def _claim_bulk_status_changes():
+	key = frappe.cache.make_key(BULK_STATUS_KEY)
+	pipe = frappe.cache.pipeline()
+	pipe.lrange(key, 0, BULK_STATUS_BATCH_SIZE - 1)
+	pipe.ltrim(key, BULK_STATUS_BATCH_SIZE, -1)
+	return [json.loads(r) for r in pipe.execute()[0]]
+
+
+def _process_status_batch(changes):
+	from frappe_telegram.handlers.helpdesk_notifications import notify_status_change
+
+	# A ticket changed several times in the batch is relayed once, from its
+	# first previous status to its latest one
+	by_ticket = {}
+	for change in changes:
+		if change["ticket"] in by_ticket:
+			by_ticket[change["ticket"]].update(
+				new_status=change["new_status"],
+				status_category=change["status_category"],
+				actor=change["actor"],
+			)
+		else:
+			by_ticket[change["ticket"]] = change
+
+	mappings = _get_latest_mappings(list(by_ticket))
+	categories = _get_status_categories(
+		{c["new_status"] for c in by_ticket.values() if not c["status_category"]}
+	)
+
+	deliveries, close, reopen = [], [], []
+	for ticket_name, change in by_ticket.items():
+		mapping = mappings.get(ticket_name)
+		if not mapping:
+			continue
+
+		category = change["status_category"] or categories.get(change["new_status"])
+		if category == "Resolved":
+			if mapping.is_open:
+				close.append(mapping.name)
+			kind = "resolved"
+		elif category == "Open" and not mapping.is_open:
+			reopen.append(mapping.name)
+			kind = "reopened"
+		else:
+			kind = "status_update" if mapping.is_open else None
+
+		if kind and mapping.chat_id:
+			deliveries.append((ticket_name, {"kind": kind, "chat_id": mapping.chat_id, "status": change["new_status"]}))
+
+		if change["old_status"] != change["new_status"]:
+			notify_status_change(ticket_name, change["old_status"], change["new_status"], actor=change["actor"])
+
+	Mapping = frappe.qb.DocType("Helpdesk Telegram Ticket")
+	for names, is_open in ((close, 0), (reopen, 1)):
+		if names:
+			frappe.qb.update(Mapping).set(Mapping.is_open, is_open).where(Mapping.name.isin(names)).run()
+	frappe.db.commit()
+
+	if not deliveries or not _is_helpdesk_bot_enabled():
 		return
+	# Through the outbox, so each message keeps its place among the ticket's
+	# other deliveries. Draining here (or leaving it to the job that holds the
+	# ticket's lock) avoids one delivery job per ticket.
+	for ticket_name, item in deliveries:
+		frappe.cache.rpush(f"{OUTBOX_KEY}:{ticket_name}", json.dumps(item))
+		deliver_outbox(ticket_name)
+		time.sleep(BULK_SEND_INTERVAL)
+
+
+def _get_latest_mappings(ticket_names):
+	"""Latest Helpdesk Telegram Ticket of each ticket, with its chat_id."""
+	Mapping = frappe.qb.DocType("Helpdesk Telegram Ticket")
+	Chat = frappe.qb.DocType("Telegram Chat")
+	rows = (
+		frappe.qb.from_(Mapping)
+		.left_join(Chat)
+		.on(Chat.name == Mapping.telegram_chat)
+		.select(Mapping.name, Mapping.ticket, Mapping.is_open, Chat.chat_id)
+		.where(Mapping.ticket.isin(ticket_names))
+		.orderby(Mapping.creation)
+		.run(as_dict=True)
+	)
+	# Ordered oldest first, so the latest mapping of a ticket wins
+	return {row.ticket: row for row in rows}
+
+
+def _get_status_categories(statuses):
+	if not statuses:
+		return {}
+	return dict(frappe.get_all(
+		"HD Ticket Status",
+		filters={"name": ("in", list(statuses))},
+		fields=["name", "category"],
+		as_list=True,
+	))
+
+
+# --- Outbox ---
+
+def _queue_delivery(ticket_name, payload, once_key=None):
+	"""Push a delivery to the ticket's outbox and start a delivery job, once the
+	current transaction commits. Nothing is sent if it rolls back.
+
+	With ``once_key`` the push is skipped while that key is set, i.e. while an
+	earlier push with the same key is still waiting in the outbox.
+	"""
+
+	def push():
+		if once_key and not frappe.cache.set(
+			frappe.cache.make_key(once_key), 1, nx=True, ex=OUTBOX_LOCK_TTL
+		):
+			return
+		frappe.cache.rpush(f"{OUTBOX_KEY}:{ticket_name}", json.dumps(payload))
+		frappe.enqueue(
+			method="frappe_telegram.handlers.helpdesk_reply.deliver_outbox",
+			queue="short",
+			ticket_name=ticket_name,
+		)
+
+	frappe.db.after_commit.add(push)
+
+
+def deliver_outbox(ticket_name):
+	"""Background job that sends a ticket's queued deliveries in order.
+
+	Only one job drains a ticket at a time; others return immediately. The
+	outbox is checked again after the lock is released, so an item pushed
+	while the lock was being released is not stranded.
+	"""
+	key = f"{OUTBOX_KEY}:{ticket_name}"
+	lock_key = f"{key}:lock"
+
+	while frappe.cache.llen(key):
+		if not frappe.cache.set(frappe.cache.make_key(lock_key), 1, nx=True, ex=OUTBOX_LOCK_TTL):
+			return
+		try:
+			token = get_helpdesk_bot_token()
+			while True:
+				item = frappe.cache.lpop(key)
+				if item is None:
+					break
+				if token:
+					_deliver(ticket_name, json.loads(item), token)
+		finally:
+			frappe.cache.delete_value(lock_key)
+
+
+def _deliver(ticket_name, item, token):
+	from frappe_telegram.handlers.helpdesk_notifications import (
+		build_rich_agent_reply_message,
+		build_rich_status_reopened_message,
+		build_rich_status_resolved_message,
+		build_rich_status_update_message,
+		get_recipient_language,
+		invalidate_ticket_snapshot,
+	)
+
+	# The ticket may have changed since the previous item was rendered
+	invalidate_ticket_snapshot(ticket_name)
+	try:
+		kind, chat_id = item["kind"], item["chat_id"]
+		lang = get_recipient_language(ticket_name) if kind in TRANSLATED_KINDS else None
+		if kind == "agent_reply":
+			msg = build_rich_agent_reply_message(ticket_name, item["html"], lang=lang)
+			send_message_api(chat_id, token, msg, parse_mode="HTML")
+		elif kind == "resolved":
+			keyboard = {
+				"inline_keyboard": [
+					[{"text": "\u2705 Reopen Ticket", "callback_data": f"reopen_ticket_{ticket_name}"}],
+					[{"text": "\U0001f3ab Create New Ticket", "callback_data": "create_ticket"}],
+				]
+			}
+			msg = build_rich_status_resolved_message(ticket_name, lang=lang)
+			send_message_api(chat_id, token, msg, reply_markup=keyboard, parse_mode="HTML")
+		elif kind == "reopened":
+			msg = build_rich_status_reopened_message(ticket_name, lang=lang)
+			send_message_api(chat_id, token, msg, parse_mode="HTML")
+		elif kind == "status_update":
+			msg = build_rich_status_update_message(ticket_name, item["status"], lang=lang)
+			send_message_api(chat_id, token, msg, parse_mode="HTML")
+		elif kind == "attachments":
+			_deliver_attachments(ticket_name, item, token)
+		elif kind == "file":
+			# Queued before attachments were grouped per Communication
+			_send_file_doc(frappe._dict(item), chat_id, token)
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Telegram Helpdesk: outbox delivery")
+
+
+def _deliver_attachments(ticket_name, item, token):
+	"""Send a Communication's not yet forwarded files as media groups."""
+	communication = item["communication"]
+
+	wait = item.get("queued_at", 0) + ATTACHMENTS_SETTLE_SECONDS - time.time()
+	if wait > 0:
+		time.sleep(wait)
+
+	# From here on a newly linked file queues its own delivery. Committing
+	# starts a fresh snapshot, so files committed meanwhile are visible.
+	frappe.cache.delete_value(f"{ATTACHMENTS_QUEUED_KEY}:{communication}")
+	frappe.db.commit()
+
+	files = _get_unforwarded_files(communication)
+	for i in range(0, len(files), MEDIA_GROUP_SIZE):
+		chunk = files[i : i + MEDIA_GROUP_SIZE]
+		if len(chunk) == 1:
+			sent = send_document_api(item["chat_id"], token, chunk[0].path, chunk[0].file_name)
+		else:
+			sent = send_media_group_api(
+				item["chat_id"], token, [(f.path, f.file_name) for f in chunk]
+			)
+		if not (sent and sent.get("ok")):
+			return
+
+		for f in chunk:
+			frappe.get_doc({
+				"doctype": "Helpdesk Telegram Forwarded File",
+				"ticket": ticket_name,
+				"communication": communication,
+				"file": f.name,
+				"content_hash": f.content_hash,
+			}).insert(ignore_permissions=True)
+		# A retry after a later failure must not send this chunk again
+		frappe.db.commit()
+
+
+def _get_unforwarded_files(communication):
+	"""The Communication's files on disk that have not been forwarded yet,
+	deduplicated by File name and content hash, oldest first."""
+	forwarded = frappe.get_all(
+		"Helpdesk Telegram Forwarded File",
+		filters={"communication": communication},
+		fields=["file", "content_hash"],
+	)
+	seen_files = {f.file for f in forwarded}
+	seen_hashes = {f.content_hash for f in forwarded if f.content_hash}
+
+	files = []
+	for f in frappe.get_all(
+		"File",
+		filters={
+			"attached_to_doctype": "Communication",
+			"attached_to_name": communication,
+			"is_folder": 0,
+		},
+		fields=["name", "file_url", "file_name", "content_hash"],
+		order_by="creation asc",
+	):
+		if f.name in seen_files or (f.content_hash and f.content_hash in seen_hashes):
+			continue
+		f.path = _get_file_path(f.file_url)
+		if not f.path:
+			continue
+		seen_files.add(f.name)
+		if f.content_hash:
+			seen_hashes.add(f.content_hash)
+		files.append(f)
+	return files
+
+
+def _get_file_path(file_url):
+	"""Path on disk of a File's ``file_url``, or None if it isn't a local file."""
+	if not file_url or "/files/" not in file_url:
+		return None
 	file_path = frappe.get_site_path(
 		(("" if "/private/" in file_url else "/public") + file_url).strip("/")
 	)
-	if os.path.exists(file_path):
+	return file_path if os.path.exists(file_path) else None
+
+
+def _send_file_doc(file_doc, chat_id, token):
+	"""Resolve a File doc's path on disk and send it to a Telegram chat."""
+	file_url = file_doc.get("file_url") if hasattr(file_doc, "get") else file_doc.file_url
+	file_name = file_doc.get("file_name") if hasattr(file_doc, "get") else file_doc.file_name
+	file_path = _get_file_path(file_url)
+	if file_path:
 		send_document_api(chat_id, token, file_path, file_name)
 
 
 def strip_html(html_content):
 	"""Strip HTML tags from content, returning plain text."""
-	try:
-		from bs4 import BeautifulSoup
-		return BeautifulSoup(html_content, "html.parser").get_text(separator="\n")
-	except ImportError:
-		import re
-		return re.sub(r"<[^>]+>", "", html_content)
+	return html_to_text(html_content)
@@ -0,0 +1,156 @@
+"""
+Default message templates for the Helpdesk Telegram integration.
+
+Every Telegram message sent to customers and every management comment is
+rendered from a ``Telegram Message Template`` record, so wording can be
+edited (and translated) without code changes. The sources below are seeded
+as records on migrate and are also used whenever a record is missing.
+
+Templates receive an HTML-escaped ``ticket`` (name, subject, status,
+priority, ticket_type, agent_group, raised_by, assigned_agent_name,
+creation) plus the extra variables listed per template.
+"""
+
+import frappe
+from frappe.utils import format_datetime
+
+from frappe_telegram.utils.templates import TEMPLATE_DOCTYPE, render_named_template
+
+TICKET_CONTEXT_FIELDS = (
+	"name", "subject", "status", "priority", "ticket_type", "agent_group", "raised_by", "assigned_agent_name",
+)
+
+DEFAULT_TEMPLATES = {
+	# Telegram messages to the customer
+	"Helpdesk: Ticket Resolved": (
+		"\u2705 <b>Ticket Resolved</b>\n\n"
+		"\U0001f3ab <b>Ticket:</b> #{{ ticket.name }}\n"
+		"\U0001f4cb <b>Subject:</b> {{ ticket.subject }}\n"
+		"\U0001f4ca <b>Priority:</b> {{ ticket.priority or 'Standard' }}\n"
+		"\U0001f464 <b>Handled by:</b> {{ ticket.assigned_agent_name }}\n\n"
+		"\U0001f44d Thank you for contacting support! If you need further assistance, "
+		"you can reopen this ticket or create a new one."
+	),
+	"Helpdesk: Ticket Reopened": (
+		"\U0001f504 <b>Ticket Reopened</b>\n\n"
+		"\U0001f3ab <b>Ticket:</b> #{{ ticket.name }}\n"
+		"\U0001f4cb <b>Subject:</b> {{ ticket.subject }}\n"
+		"\U0001f7e2 <b>Status:</b> Re-Open\n\n"
+		"\U0001f4ac Your ticket has been reopened. You can now send follow-up messages."
+	),
+	# Extra: new_status
+	"Helpdesk: Status Update": (
+		"\U0001f4e2 <b>Ticket Status Update</b>\n\n"
+		"\U0001f3ab <b>Ticket:</b> #{{ ticket.name }}\n"
+		"\U0001f4cb <b>Subject:</b> {{ ticket.subject }}\n"
+		"\U0001f195 <b>New Status:</b> {{ new_status }}\n"
+		"\U0001f4ca <b>Priority:</b> {{ ticket.priority or 'Standard' }}\n"
+		"\U0001f464 <b>Assigned to:</b> {{ ticket.assigned_agent_name }}"
+	),
+	# Extra: message (the reply, already converted to Telegram HTML)
+	"Helpdesk: Agent Reply": (
+		"\U0001f4e9 <b>Agent Reply</b>\n\n"
+		"\U0001f3ab <b>Ticket:</b> #{{ ticket.name }} - {{ ticket.subject }}\n"
+		"\U0001f464 <b>From:</b> {{ ticket.assigned_agent_name }}\n\n"
+		"{{ message }}"
+	),
+	"Helpdesk: Ticket Details": (
+		"\U0001f3ab <b>Ticket #{{ ticket.name }}</b>\n\n"
+		"\U0001f4cb <b>Subject:</b> {{ ticket.subject }}\n"
+		"\U0001f4c8 <b>Status:</b> {{ ticket.status }}\n"
+		"\U0001f4ca <b>Priority:</b> {{ ticket.priority or 'Standard' }}\n"
+		"\U0001f464 <b>Assigned to:</b> {{ ticket.assigned_agent_name }}\n"
+		"\U0001f552 <b>Created:</b> {{ ticket.creation }}"
+	),
+	"Helpdesk: Follow-up Confirmation": (
+		"\u2705 <b>Message Sent</b>\n\n"
+		"\U0001f3ab <b>Ticket:</b> #{{ ticket.name }}\n"
+		"\U0001f4cb <b>Subject:</b> {{ ticket.subject }}\n"
+		"\U0001f4c8 <b>Status:</b> {{ ticket.status }}\n\n"
+		"\U0001f552 Your message has been added. An agent will review it shortly."
+	),
+	# Management comments on the HD Ticket timeline. Extra: time, plus
+	# tg_user, actor_name, old_status, new_status or preview as applicable
+	"Helpdesk: Ticket Created Comment": (
+		"<b>\U0001f3ab New Ticket Created via Telegram</b><br>"
+		"<b>Created by:</b> {{ tg_user }}<br>"
+		"<b>Subject:</b> {{ ticket.subject }}<br>"
+		"<b>Priority:</b> {{ ticket.priority or 'Not set' }}<br>"
+		"<b>Type:</b> {{ ticket.ticket_type or 'Not set' }}<br>"
+		"<b>Agent Group:</b> {{ ticket.agent_group or 'Not set' }}<br>"
+		"<b>Raised by:</b> {{ ticket.raised_by or 'N/A' }}<br>"
+		"<b>Time:</b> {{ time }}"
+	),
+	"Helpdesk: Status Change Comment": (
+		"<b>\U0001f504 Status Changed</b><br>"
+		"<b>From:</b> {{ old_status }} <b>\u2192 To:</b> {{ new_status }}<br>"
+		"<b>Changed by:</b> {{ actor_name }}<br>"
+		"<b>Ticket:</b> #{{ ticket.name }} - {{ ticket.subject }}<br>"
+		"<b>Priority:</b> {{ ticket.priority or 'Not set' }}<br>"
+		"<b>Assigned to:</b> {{ ticket.assigned_agent_name }}<br>"
+		"<b>Time:</b> {{ time }}"
+	),
+	"Helpdesk: Ticket Reopened Comment": (
+		"<b>\U0001f513 Ticket Reopened via Telegram</b><br>"
+		"<b>Reopened by:</b> {{ tg_user }}<br>"
+		"<b>Ticket:</b> #{{ ticket.name }} - {{ ticket.subject }}<br>"
+		"<b>Priority:</b> {{ ticket.priority or 'Not set' }}<br>"
+		"<b>Assigned to:</b> {{ ticket.assigned_agent_name }}<br>"
+		"<b>Time:</b> {{ time }}"
+	),
+	"Helpdesk: Customer Response Comment": (
+		"<b>\U0001f4ac Customer Response via Telegram</b><br>"
+		"<b>From:</b> {{ tg_user }}<br>"
+		"<b>Ticket:</b> #{{ ticket.name }} - {{ ticket.subject }}<br>"
+		"<b>Status:</b> {{ ticket.status }} | <b>Assigned to:</b> {{ ticket.assigned_agent_name }}<br>"
+		"<b>Message:</b> {{ preview }}<br>"
+		"<b>Time:</b> {{ time }}"
+	),
+	"Helpdesk: Agent Response Comment": (
+		"<b>\U0001f468\u200d\U0001f4bc Agent Response Sent to Telegram</b><br>"
+		"<b>Agent:</b> {{ actor_name }}<br>"
+		"<b>Ticket:</b> #{{ ticket.name }} - {{ ticket.subject }}<br>"
+		"<b>Status:</b> {{ ticket.status }}<br>"
+		"<b>Response:</b> {{ preview }}<br>"
+		"<b>Time:</b> {{ time }}"
+	),
+}
+
+
+def render_helpdesk_template(name, ticket, lang=None, **context):
+	"""Render one of the DEFAULT_TEMPLATES for a ticket snapshot.
+
+	Extra keyword values are inserted as given, so callers pass them already
+	escaped.
+	"""
+	context["ticket"] = get_ticket_context(ticket)
+	return render_named_template(name, context, lang=lang, default=DEFAULT_TEMPLATES[name])
+
+
+def get_ticket_context(ticket):
+	"""HTML-escaped view of a ticket snapshot, built once per snapshot."""
+	if "_context" not in ticket:
+		context = frappe._dict({
+			field: frappe.utils.escape_html(str(ticket.get(field))) if ticket.get(field) else ""
+			for field in TICKET_CONTEXT_FIELDS
+		})
+		context.creation = format_datetime(ticket.creation, "dd MMM yyyy, hh:mm a") if ticket.creation else ""
+		ticket._context = context
+	return ticket._context
+
+
+def ensure_default_templates():
+	"""Create any missing default template record. Existing records are left as edited."""
+	existing = set(frappe.get_all(
+		TEMPLATE_DOCTYPE,
+		filters={"name": ("in", list(DEFAULT_TEMPLATES))},
+		pluck="name",
+	))
+	for name, source in DEFAULT_TEMPLATES.items():
+		if name in existing:
+			continue
+		frappe.get_doc({
+			"doctype": TEMPLATE_DOCTYPE,
+			"template_name": name,
+			"default_template": source,
+		}).insert(ignore_permissions=True)
@@ -3,6 +3,8 @@ import requests
 
 import frappe
 
+TELEGRAM_API_URL = "https://api.telegram.org"
+
 
 def send_message_api(chat_id, token, text, reply_markup=None, parse_mode=None):
 	"""Send a text message via Telegram Bot API.
@@ -16,7 +18,7 @@ def send_message_api(chat_id, token, text, reply_markup=None, parse_mode=None):
 	if parse_mode:
 		payload["parse_mode"] = parse_mode
 
-	url = f"https://api.telegram.org/bot{token}/sendMessage"
+	url = f"{TELEGRAM_API_URL}/bot{token}/sendMessage"
 	try:
 		response = requests.post(url, json=payload, timeout=10)
 		response.raise_for_status()
@@ -34,6 +36,26 @@ def send_message_api(chat_id, token, text, reply_markup=None, parse_mode=None):
 		frappe.log_error(str(e)[:140], "Telegram sendMessage Error")
 
 
+def edit_message_text_api(chat_id, message_id, token, text, reply_markup=None, parse_mode=None):
+	"""Replace the text (and inline keyboard) of a message the bot sent earlier."""
+	payload = {"chat_id": chat_id, "message_id": message_id, "text": text}
+	if reply_markup:
+		payload["reply_markup"] = json.dumps(reply_markup) if isinstance(reply_markup, dict) else reply_markup
+	if parse_mode:
+		payload["parse_mode"] = parse_mode
+
+	try:
+		response = requests.post(
+			f"{TELEGRAM_API_URL}/bot{token}/editMessageText",
+			json=payload,
+			timeout=10,
+		)
+		response.raise_for_status()
+		return response.json()
+	except Exception as e:
+		frappe.log_error(str(e)[:140], "Telegram editMessageText Error")
+
+
 def answer_callback_query(callback_query_id, token, text=None):
 	"""Acknowledge a callback query from an inline keyboard button."""
 	payload = {"callback_query_id": callback_query_id}
@@ -42,7 +64,7 @@ def answer_callback_query(callback_query_id, token, text=None):
 
 	try:
 		requests.post(
-			f"https://api.telegram.org/bot{token}/answerCallbackQuery",
+			f"{TELEGRAM_API_URL}/bot{token}/answerCallbackQuery",
 			json=payload,
 			timeout=10,
 		)
@@ -50,6 +72,31 @@ def answer_callback_query(callback_query_id, token, text=None):
 		frappe.log_error(str(e)[:140], "Telegram Callback Error")
 
 
+def answer_inline_query(inline_query_id, token, results, cache_time=30, is_personal=True, button=None):
+	"""Answer an inline query (``@bot <query>``).
+
+	With ``is_personal`` Telegram caches the results per user for
+	``cache_time`` seconds, so repeated keystrokes don't reach the bot.
+	"""
+	payload = {
+		"inline_query_id": inline_query_id,
+		"results": results,
+		"cache_time": cache_time,
+		"is_personal": is_personal,
+	}
+	if button:
+		payload["button"] = button
+
+	try:
+		requests.post(
+			f"{TELEGRAM_API_URL}/bot{token}/answerInlineQuery",
+			json=payload,
+			timeout=10,
+		)
+	except Exception as e:
+		frappe.log_error(str(e)[:140], "Telegram Inline Query Error")
+
+
 def send_document_api(chat_id, token, file_path, filename, caption=None):
 	"""Send a document to a Telegram chat via Bot API."""
 	payload = {"chat_id": chat_id}
@@ -59,7 +106,7 @@ def send_document_api(chat_id, token, file_path, filename, caption=None):
 	try:
 		with open(file_path, "rb") as f:
 			response = requests.post(
-				f"https://api.telegram.org/bot{token}/sendDocument",
+				f"{TELEGRAM_API_URL}/bot{token}/sendDocument",
 				data=payload,
 				files={"document": (filename, f)},
 				timeout=30,
@@ -70,11 +117,40 @@ def send_document_api(chat_id, token, file_path, filename, caption=None):
 		frappe.log_error(str(e)[:140], "Telegram sendDocument Error")
 
 
+def send_media_group_api(chat_id, token, files):
+	"""Send 2-10 documents to a Telegram chat as one album.
+
+	``files`` is a list of ``(file_path, filename)`` tuples.
+	"""
+	handles = []
+	try:
+		media, uploads = [], {}
+		for i, (file_path, filename) in enumerate(files):
+			f = open(file_path, "rb")
+			handles.append(f)
+			media.append({"type": "document", "media": f"attach://file{i}"})
+			uploads[f"file{i}"] = (filename, f)
+
+		response = requests.post(
+			f"{TELEGRAM_API_URL}/bot{token}/sendMediaGroup",
+			data={"chat_id": chat_id, "media": json.dumps(media)},
+			files=uploads,
+			timeout=60,
+		)
+		response.raise_for_status()
+		return response.json()
+	except Exception as e:
+		frappe.log_error(str(e)[:140], "Telegram sendMediaGroup Error")
+	finally:
+		for f in handles:
+			f.close()
+
+
 def get_file_info(file_id, token):
 	"""Get file path on Telegram servers for a given file_id."""
 	try:
 		response = requests.post(
-			f"https://api.telegram.org/bot{token}/getFile",
+			f"{TELEGRAM_API_URL}/bot{token}/getFile",
 			json={"file_id": file_id},
 			timeout=10,
 		)
@@ -91,7 +167,7 @@ def download_telegram_file(file_path, token):
 	"""Download file bytes from Telegram servers."""
 	try:
 		response = requests.get(
-			f"https://api.telegram.org/file/bot{token}/{file_path}",
+			f"{TELEGRAM_API_URL}/file/bot{token}/{file_path}",
 			timeout=30,
 		)
 		response.raise_for_status()
@@ -101,11 +177,35 @@ def download_telegram_file(file_path, token):
 	return None
 
 
+def fetch_file_bytes(file_id, token, timeout=30):
+	"""getFile + download in one call, raising on any failure.
+
+	Unlike ``get_file_info``/``download_telegram_file`` this never touches
+	frappe (no error logging), so it is safe to run from worker threads.
+	"""
+	response = requests.post(
+		f"{TELEGRAM_API_URL}/bot{token}/getFile",
+		json={"file_id": file_id},
+		timeout=10,
+	)
+	response.raise_for_status()
+	data = response.json()
+	if not data.get("ok") or not data["result"].get("file_path"):
+		raise ValueError(data.get("description") or "Telegram returned no file path")
+
+	response = requests.get(
+		f"{TELEGRAM_API_URL}/file/bot{token}/{data['result']['file_path']}",
+		timeout=timeout,
+	)
+	response.raise_for_status()
+	return response.content
+
+
 def get_updates(token, offset=0, timeout=30):
 	"""Poll Telegram for new updates. Returns empty list on 409 (concurrent poll)."""
 	try:
 		response = requests.get(
-			f"https://api.telegram.org/bot{token}/getUpdates",
+			f"{TELEGRAM_API_URL}/bot{token}/getUpdates",
 			params={"offset": offset, "timeout": timeout},
 			timeout=timeout + 5,
 		)
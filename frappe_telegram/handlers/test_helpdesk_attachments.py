@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import frappe
+
+from frappe_telegram.handlers import telegram_api
+from frappe_telegram.handlers.helpdesk_attachments import select_photo_size
+
+PHOTO_SIZES = [
+	{"file_id": "s", "width": 90, "height": 67, "file_size": 1_200},
+	{"file_id": "m", "width": 320, "height": 240, "file_size": 18_000},
+	{"file_id": "x", "width": 800, "height": 600, "file_size": 80_000},
+	{"file_id": "y", "width": 1280, "height": 960, "file_size": 160_000},
+	{"file_id": "w", "width": 2560, "height": 1920, "file_size": 900_000},
+]
+
+
+class TestSelectPhotoSize(unittest.TestCase):
+	def test_largest_is_default(self):
+		self.assertEqual(select_photo_size(PHOTO_SIZES, frappe._dict())["file_id"], "w")
+
+	def test_max_dimension(self):
+		settings = frappe._dict(photo_size_policy="Max Dimension", photo_max_dimension=1280)
+		self.assertEqual(select_photo_size(PHOTO_SIZES, settings)["file_id"], "y")
+
+	def test_max_file_size(self):
+		settings = frappe._dict(photo_size_policy="Max File Size", photo_max_file_size=100)
+		self.assertEqual(select_photo_size(PHOTO_SIZES, settings)["file_id"], "x")
+
+	def test_falls_back_to_smallest(self):
+		settings = frappe._dict(photo_size_policy="Max Dimension", photo_max_dimension=10)
+		self.assertEqual(select_photo_size(PHOTO_SIZES, settings)["file_id"], "s")
+
+
+# Renditions Telegram sent for a phone screenshot and a camera photo
+PHOTO_LADDERS = {
+	"screenshot": [
+		{"file_id": "shot-s", "width": 41, "height": 90, "file_size": 1_500},
+		{"file_id": "shot-m", "width": 146, "height": 320, "file_size": 14_000},
+		{"file_id": "shot-x", "width": 365, "height": 800, "file_size": 62_000},
+		{"file_id": "shot-y", "width": 584, "height": 1280, "file_size": 118_000},
+		{"file_id": "shot-w", "width": 1179, "height": 2556, "file_size": 412_000},
+	],
+	"camera": [
+		{"file_id": "cam-s", "width": 90, "height": 68, "file_size": 1_300},
+		{"file_id": "cam-m", "width": 320, "height": 240, "file_size": 17_000},
+		{"file_id": "cam-x", "width": 800, "height": 600, "file_size": 79_000},
+		{"file_id": "cam-y", "width": 1280, "height": 960, "file_size": 171_000},
+		{"file_id": "cam-w", "width": 2560, "height": 1920, "file_size": 913_000},
+	],
+}
+PHOTO_POLICIES = {
+	"Max Dimension 1280": frappe._dict(photo_size_policy="Max Dimension", photo_max_dimension=1280),
+	"Max File Size 200 KB": frappe._dict(photo_size_policy="Max File Size", photo_max_file_size=200),
+}
+# Download speed the local file server is throttled to, in bytes per second
+DOWNLOAD_SPEED = 4 * 1024 * 1024
+
+
+class TestPhotoSizeCost(unittest.TestCase):
+	"""Bandwidth, disk and download latency of each policy against always taking the largest.
+
+	Stored files are the downloaded bytes, so bandwidth and disk are the same
+	figure. Latency is timed through fetch_file_bytes against a local server
+	throttled to DOWNLOAD_SPEED.
+	"""
+
+	@classmethod
+	def setUpClass(cls):
+		sizes = {p["file_id"]: p["file_size"] for ladder in PHOTO_LADDERS.values() for p in ladder}
+		cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _file_server(sizes))
+		threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.server.shutdown()
+		cls.server.server_close()
+
+	def test_policies_against_largest(self):
+		api_url = f"http://127.0.0.1:{self.server.server_port}"
+		report = []
+		with patch.object(telegram_api, "TELEGRAM_API_URL", api_url):
+			for photo, ladder in PHOTO_LADDERS.items():
+				largest = ladder[-1]
+				before = self._download(largest)
+				for policy, settings in PHOTO_POLICIES.items():
+					chosen = select_photo_size(ladder, frappe._dict(settings))
+					after = self._download(chosen)
+					self.assertLess(chosen["file_size"], largest["file_size"], f"{photo}, {policy}")
+					self.assertLess(after, before, f"{photo}, {policy}")
+					report.append((photo, policy, largest["file_size"], chosen["file_size"], before, after))
+
+		print("\nphoto       policy                 bytes before  bytes after  ms before  ms after")
+		for photo, policy, bytes_before, bytes_after, before, after in report:
+			print(
+				f"{photo:11s} {policy:22s} {bytes_before:12d} {bytes_after:12d} "
+				f"{before * 1000:10.1f} {after * 1000:9.1f}"
+			)
+
+	def _download(self, photo_size):
+		start = time.perf_counter()
+		content = telegram_api.fetch_file_bytes(photo_size["file_id"], "TOKEN")
+		elapsed = time.perf_counter() - start
+		self.assertEqual(len(content), photo_size["file_size"])
+		return elapsed
+
+
+def _file_server(sizes):
+	"""Handler answering getFile and file downloads like the Bot API, throttled."""
+
+	class Handler(BaseHTTPRequestHandler):
+		def do_POST(self):
+			file_id = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["file_id"]
+			self._send(json.dumps({"ok": True, "result": {"file_path": f"photos/{file_id}.jpg"}}).encode())
+
+		def do_GET(self):
+			file_id = self.path.rsplit("/", 1)[-1].removesuffix(".jpg")
+			self._send(b"\0" * sizes[file_id], throttle=True)
+
+		def _send(self, body, throttle=False):
+			self.send_response(200)
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			chunk = 64 * 1024
+			for i in range(0, len(body), chunk):
+				self.wfile.write(body[i : i + chunk])
+				if throttle:
+					time.sleep(len(body[i : i + chunk]) / DOWNLOAD_SPEED)
+
+		def log_message(self, *args):
+			pass
+
+	return Handler
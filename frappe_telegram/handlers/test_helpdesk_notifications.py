@@ -0,0 +1,113 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import frappe
+
+from frappe_telegram.handlers.helpdesk_notifications import (
+	fan_out_notification,
+	get_ticket_snapshot,
+	invalidate_ticket_snapshot,
+)
+from frappe_telegram.handlers.helpdesk_reply import on_ticket_update
+
+
+class UnchangedTicket(frappe._dict):
+	def has_value_changed(self, fieldname):
+		return False
+
+
+class TestTicketSnapshot(unittest.TestCase):
+	def tearDown(self):
+		frappe.local.telegram_ticket_snapshots = None
+
+	def test_hook_runs_without_memo(self):
+		frappe.local.telegram_ticket_snapshots = None
+		on_ticket_update(UnchangedTicket(name="HD-1"), "on_update")
+
+	def test_snapshot_is_memoized_and_invalidated(self):
+		snapshot = frappe._dict(name="HD-1", subject="Printer")
+		frappe.local.telegram_ticket_snapshots = {"HD-1": snapshot, "HD-2": frappe._dict(name="HD-2")}
+		self.assertIs(get_ticket_snapshot("HD-1"), snapshot)
+
+		on_ticket_update(UnchangedTicket(name="HD-1"), "on_update")
+		self.assertNotIn("HD-1", frappe.local.telegram_ticket_snapshots)
+		self.assertIn("HD-2", frappe.local.telegram_ticket_snapshots)
+
+		invalidate_ticket_snapshot()
+		self.assertEqual(frappe.local.telegram_ticket_snapshots, {})
+
+
+# Recipient counts the fan-out is benchmarked at; the per-document baseline
+# is only run up to PER_DOCUMENT_LIMIT, as it grows linearly
+RECIPIENT_COUNTS = (1, 10, 100, 1000)
+PER_DOCUMENT_LIMIT = 100
+# Notification Log insert, unseen flag update, HD Notification insert
+FAN_OUT_QUERIES = 3
+
+
+class TestNotificationFanOut(unittest.TestCase):
+	"""Fan-out cost against recipient count, inside a rolled back transaction."""
+
+	def setUp(self):
+		if not frappe.db.exists("DocType", "HD Notification"):
+			self.skipTest("Helpdesk is not installed")
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_queries_do_not_grow_with_recipients(self):
+		for count in RECIPIENT_COUNTS:
+			with patch.object(frappe.db, "sql", wraps=frappe.db.sql) as sql:
+				fan_out_notification(_users(count), "HD-BENCH", "Subject", "Message", "HD message")
+			self.assertEqual(sql.call_count, FAN_OUT_QUERIES, f"{count} recipients")
+			frappe.db.rollback()
+
+	def test_runtime_against_recipient_count(self):
+		report = []
+		for count in RECIPIENT_COUNTS:
+			bulk = _timed(fan_out_notification, _users(count), "HD-BENCH", "Subject", "Message", "HD message")
+			per_document = None
+			if count <= PER_DOCUMENT_LIMIT:
+				per_document = _timed(_fan_out_per_document, _users(count))
+				self.assertLess(bulk, per_document, f"{count} recipients")
+			report.append((count, bulk, per_document))
+
+		print("\nrecipients  bulk ms  per-document ms")
+		for count, bulk, per_document in report:
+			per_document = f"{per_document * 1000:15.1f}" if per_document is not None else f"{'-':>15}"
+			print(f"{count:10d} {bulk * 1000:8.1f} {per_document}")
+
+
+def _users(count):
+	return [f"fan-out-{i}@example.com" for i in range(count)]
+
+
+def _timed(fn, *args):
+	start = time.perf_counter()
+	fn(*args)
+	elapsed = time.perf_counter() - start
+	frappe.db.rollback()
+	return elapsed
+
+
+def _fan_out_per_document(users):
+	"""The previous fan-out: one Notification Log and one HD Notification document per user."""
+	for user in users:
+		frappe.get_doc({
+			"doctype": "Notification Log",
+			"for_user": user,
+			"type": "Alert",
+			"document_type": "HD Ticket",
+			"document_name": "HD-BENCH",
+			"subject": "Subject",
+			"email_content": "Message",
+		}).insert(ignore_permissions=True, ignore_links=True)
+		frappe.get_doc({
+			"doctype": "HD Notification",
+			"user_from": "Administrator",
+			"user_to": user,
+			"notification_type": "Mention",
+			"reference_ticket": "HD-BENCH",
+			"message": "HD message",
+		}).insert(ignore_permissions=True, ignore_links=True)
@@ -127,6 +127,13 @@ doc_events = {
     "File": {
         "after_insert": "frappe_telegram.handlers.helpdesk_reply.on_file_insert",
         "on_update": "frappe_telegram.handlers.helpdesk_reply.on_file_update"
+    },
+    "User": {
+        "on_update": "frappe_telegram.handlers.helpdesk_notifications.on_user_update",
+        "on_trash": "frappe_telegram.handlers.helpdesk_notifications.clear_notification_recipients_cache"
+    },
+    "Notification Settings": {
+        "on_update": "frappe_telegram.handlers.helpdesk_notifications.clear_notification_recipients_cache"
     }
 }
 
@@ -134,9 +141,15 @@ doc_events = {
 # ---------------
 
 scheduler_events = {
+    "hourly": [
+        "frappe_telegram.jobs.cleanup_conversations.cleanup_abandoned_drafts",
+        "frappe_telegram.frappe_telegram.doctype.telegram_broadcast.telegram_broadcast.resume_stalled_broadcasts"
+    ],
     "cron": {
         "*/1 * * * *": [
-            "frappe_telegram.jobs.poll_updates.poll_telegram_updates"
+            "frappe_telegram.jobs.poll_updates.poll_telegram_updates",
+            "frappe_telegram.handlers.helpdesk_notifications.flush_pending_notifications",
+            "frappe_telegram.handlers.helpdesk_notifications.flush_notification_digests"
         ]
     }
 }
@@ -0,0 +1,126 @@
+import os
+import time
+
+import frappe
+from frappe.utils import add_to_date, now_datetime
+
+STATE_DOCTYPE = "Telegram Conversation State"
+
+# States handled per transaction, and the wall-clock budget for one run
+BATCH_SIZE = 200
+MAX_RUNTIME = 120
+
+
+def cleanup_abandoned_drafts():
+	"""Scheduled job that resets ticket drafts idle beyond the configured timeout.
+
+	Runs hourly via scheduler_events. Files uploaded for those drafts are
+	deleted with set-based queries and their disk content unlinked in bulk,
+	one batch per transaction, until nothing is left or MAX_RUNTIME is spent.
+	"""
+	timeout = frappe.db.get_single_value("Helpdesk Telegram Settings", "draft_timeout_hours")
+	if not timeout:
+		return
+
+	cutoff = add_to_date(now_datetime(), hours=-timeout)
+	deadline = time.monotonic() + MAX_RUNTIME
+	totals = frappe._dict(states=0, files=0, bytes=0)
+
+	while time.monotonic() < deadline:
+		reclaimed = _cleanup_batch(cutoff)
+		for key, value in reclaimed.items():
+			totals[key] += value
+		if reclaimed.states < BATCH_SIZE:
+			break
+
+	if totals.states:
+		frappe.logger("frappe_telegram").info(
+			f"Reset {totals.states} abandoned Telegram ticket drafts, deleted {totals.files} "
+			f"files ({totals.bytes / 1024 / 1024:.1f} MB)"
+		)
+	return totals
+
+
+def _cleanup_batch(cutoff):
+	State = frappe.qb.DocType(STATE_DOCTYPE)
+
+	# Lock the batch so a user resuming their draft mid-run simply waits for us
+	states = (
+		frappe.qb.from_(State)
+		.select(State.name)
+		.where(State.state != "idle")
+		.where(State.modified < cutoff)
+		.orderby(State.modified)
+		.limit(BATCH_SIZE)
+		.for_update()
+	).run(pluck=True)
+	if not states:
+		return frappe._dict(states=0, files=0, bytes=0)
+
+	files = frappe.get_all(
+		"File",
+		filters={"attached_to_doctype": STATE_DOCTYPE, "attached_to_name": ("in", states)},
+		fields=["name", "file_url", "content_hash", "file_size"],
+	)
+	paths = _get_unshared_paths(files)
+	if files:
+		frappe.db.delete("File", {"name": ("in", [f.name for f in files])})
+
+	# Clearing collected_data also drops the draft's session id, so any upload
+	# still being downloaded for it is discarded instead of attached.
+	(
+		frappe.qb.update(State)
+		.set(State.state, "idle")
+		.set(State.collected_data, "{}")
+		.set(State.current_field_index, 0)
+		.where(State.name.isin(states))
+	).run()
+	frappe.db.commit()
+
+	# Unlink only after the rows are gone for good
+	for path in paths:
+		try:
+			os.remove(path)
+		except FileNotFoundError:
+			pass
+		except OSError:
+			frappe.log_error(frappe.get_traceback(), "Telegram Helpdesk: draft file cleanup")
+
+	return frappe._dict(states=len(states), files=len(files), bytes=sum(f.file_size or 0 for f in files))
+
+
+def _get_unshared_paths(files):
+	"""Disk paths of the given Files whose content no other File row references."""
+	if not files:
+		return set()
+
+	names = [f.name for f in files]
+	hashes = list({f.content_hash for f in files if f.content_hash})
+	urls = list({f.file_url for f in files if f.file_url})
+	shared_hashes, shared_urls = set(), set()
+	# Deduplicated uploads point several File rows at the same content, and
+	# rows linked to a known Telegram file copy its file_url, possibly
+	# without a content_hash
+	if hashes:
+		shared_hashes = set(frappe.get_all(
+			"File",
+			filters={"content_hash": ("in", hashes), "name": ("not in", names)},
+			pluck="content_hash",
+		))
+	if urls:
+		shared_urls = set(frappe.get_all(
+			"File",
+			filters={"file_url": ("in", urls), "name": ("not in", names)},
+			pluck="file_url",
+		))
+
+	paths = set()
+	for f in files:
+		if not f.file_url or "/files/" not in f.file_url:
+			continue
+		if f.content_hash in shared_hashes or f.file_url in shared_urls:
+			continue
+		paths.add(frappe.get_site_path(
+			(("" if "/private/" in f.file_url else "/public") + f.file_url).strip("/")
+		))
+	return paths
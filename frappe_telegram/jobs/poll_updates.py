@@ -4,6 +4,8 @@ import frappe
 
 from frappe_telegram.handlers.telegram_api import get_updates
 from frappe_telegram.handlers.helpdesk import process_update
+from frappe_telegram.handlers.helpdesk_notifications import invalidate_ticket_snapshot
+from frappe_telegram.utils.bots import get_bot_token
 
 
 LOCK_KEY = "telegram_helpdesk_polling"
@@ -32,8 +34,7 @@ def poll_telegram_updates():
 
 
 def _do_poll(settings):
-	bot_doc = frappe.get_doc("Telegram Bot", settings.bot)
-	token = bot_doc.get_password("api_token")
+	token = get_bot_token(settings.bot)
 	if not token:
 		frappe.log_error("Bot API token not configured", "Telegram Helpdesk")
 		return
@@ -55,6 +56,8 @@ def _do_poll(settings):
 		updates = get_updates(token, offset=offset, timeout=poll_timeout)
 
 		for update_data in updates:
+			# Ticket snapshots are memoized per update, not for the whole poll
+			invalidate_ticket_snapshot()
 			try:
 				process_update(update_data, token, settings)
 			except Exception:
@@ -2,6 +2,7 @@ import frappe
 from frappe.email.doctype.notification.notification import Notification, get_context
 from frappe_telegram.client import send_file, send_message
 from frappe_telegram.frappe_telegram.doctype.telegram_bot import DEFAULT_TELEGRAM_BOT_KEY
+from frappe_telegram.utils.telegram_users import resolve_telegram_user_ids
 
 
 """
@@ -50,8 +51,11 @@ def send_telegram_notification(notification, doc):
         attachment.pop("print_format_attachment")
         print_file = frappe.attach_print(**attachment)
 
+    # One lookup for all recipients; the send jobs then resolve from cache
+    telegram_user_ids = resolve_telegram_user_ids(users=users)
+
     for user in users:
-        if not frappe.db.exists("Telegram User", {"user": user}):
+        if user not in telegram_user_ids:
             continue
 
         frappe.enqueue(
@@ -10,6 +10,9 @@ def after_install():
 def after_migrate():
     add_telegram_notification_channel()
     _ensure_notification_defaults()
+    _ensure_numeric_defaults()
+    _ensure_helpdesk_templates()
+    _warm_helpdesk_caches()
 
 
 def _ensure_notification_defaults():
@@ -47,3 +50,57 @@ def _ensure_notification_defaults():
     if changed:
         settings.save(ignore_permissions=True)
         frappe.db.commit()
+
+
+# Numeric settings added after the doctype was first installed. Without a
+# value the feature using them is off: the draft cleanup skips its run, and
+# notifications are neither coalesced nor digested on schedule.
+NUMERIC_SETTING_DEFAULTS = {
+    # Abandoned draft cleanup (jobs/cleanup_conversations.py)
+    "draft_timeout_hours": 24,
+    # Coalesced management notifications
+    "notification_coalesce_seconds": 60,
+    # Notification digests
+    "digest_interval_minutes": 60,
+}
+
+
+def _ensure_numeric_defaults():
+    """Give numeric settings their JSON default on sites that predate them.
+
+    Like Check fields, an Int added to an existing SingleDocType reads as
+    NULL until the settings are saved.
+    """
+    if not frappe.db.exists("DocType", "Helpdesk Telegram Settings"):
+        return
+
+    saved = set(frappe.db.sql_list(
+        "SELECT field FROM tabSingles WHERE doctype=%s AND field IN %s",
+        ("Helpdesk Telegram Settings", tuple(NUMERIC_SETTING_DEFAULTS)),
+    ))
+    missing = {f: v for f, v in NUMERIC_SETTING_DEFAULTS.items() if f not in saved}
+    if not missing:
+        return
+
+    settings = frappe.get_doc("Helpdesk Telegram Settings")
+    settings.update(missing)
+    settings.save(ignore_permissions=True)
+    frappe.db.commit()
+
+
+def _ensure_helpdesk_templates():
+    """Seed the default helpdesk message templates that do not exist yet."""
+    from frappe_telegram.handlers.helpdesk_templates import ensure_default_templates
+
+    ensure_default_templates()
+    frappe.db.commit()
+
+
+def _warm_helpdesk_caches():
+    """Record recent Telegram helpdesk replies in Redis, so their attachments are forwarded."""
+    if not frappe.db.exists("DocType", "HD Ticket"):
+        return
+
+    from frappe_telegram.handlers.helpdesk_reply import warm_telegram_communications
+
+    warm_telegram_communications()
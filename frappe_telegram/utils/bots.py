@@ -0,0 +1,199 @@
+"""
+Process-local cache of decrypted Telegram Bot tokens and bot clients.
+
+Reading a token costs a query on the __Auth table and a Fernet decrypt.
+Tokens are kept in memory for TOKEN_TTL seconds, tagged with a site-wide
+version number held in Redis. Saving or deleting a Telegram Bot bumps the
+version, so every worker drops its copy on its next lookup.
+
+python-telegram-bot clients are async. Each process runs one event loop in
+a daemon thread; ``get_bot_client`` hands out one initialized ExtBot per
+bot, token version and token, all sharing a single HTTP connection pool, and
+``run_async`` lets synchronous code wait on them.
+"""
+import asyncio
+import os
+import threading
+import time
+
+import frappe
+from frappe.utils.password import get_decrypted_password
+
+TOKEN_TTL = 300
+TOKEN_VERSION_KEY = "telegram_bot_token_version"
+
+# Connections shared by every bot client of the process
+CONNECTION_POOL_SIZE = 32
+CALL_TIMEOUT = 60
+
+# Telegram allows about 30 messages per second per bot
+MESSAGES_PER_SECOND = 25
+
+# (site, bot) -> (version, expires_at, token)
+_tokens = {}
+
+# (site, bot) -> (version, token, ExtBot)
+_bots = {}
+# (site, bot) -> RateLimiter
+_rate_limiters = {}
+_bots_lock = threading.Lock()
+
+# Event loop thread and connection pool, owned by the process in _loop_pid
+_loop = None
+_loop_pid = None
+_request = None
+
+
+def get_bot_token(telegram_bot: str) -> str:
+    """
+    Returns the decrypted api_token of a Telegram Bot, or None if it has none
+
+    telegram_bot: `str`
+        Name of the Telegram Bot
+    """
+    key = (frappe.local.site, telegram_bot)
+    version = get_token_version()
+
+    cached = _tokens.get(key)
+    if cached and cached[0] == version and cached[1] > time.monotonic():
+        return cached[2]
+
+    token = get_decrypted_password("Telegram Bot", telegram_bot, "api_token", raise_exception=False)
+    _tokens[key] = (version, time.monotonic() + TOKEN_TTL, token)
+    return token
+
+
+def get_helpdesk_bot_token() -> str:
+    """Returns the token of the bot selected in Helpdesk Telegram Settings, or None"""
+    bot = frappe.get_cached_doc("Helpdesk Telegram Settings").bot
+    return get_bot_token(bot) if bot else None
+
+
+def get_token_version() -> int:
+    return int(frappe.cache.get(frappe.cache.make_key(TOKEN_VERSION_KEY)) or 0)
+
+
+def clear_bot_token_cache():
+    """
+    Invalidate cached tokens in every process of this site
+
+    Call it once the change is committed, e.g. from ``frappe.db.after_commit``
+    """
+    frappe.cache.incr(frappe.cache.make_key(TOKEN_VERSION_KEY))
+
+
+def get_bot_client(telegram_bot: str):
+    """
+    Returns an initialized `telegram.ext.ExtBot` for a Telegram Bot, shared by the process
+
+    Its coroutines must run on the process' bot event loop, see `run_async`.
+
+    telegram_bot: `str`
+        Name of the Telegram Bot
+    """
+    key = (frappe.local.site, telegram_bot)
+    version = get_token_version()
+    # Re-read once TOKEN_TTL passes, so a token rotated without a version
+    # bump (e.g. a lost Redis key) still replaces the client
+    token = get_bot_token(telegram_bot)
+    _get_loop()
+
+    cached = _bots.get(key)
+    if cached and cached[:2] == (version, token):
+        return cached[2]
+
+    with _bots_lock:
+        cached = _bots.get(key)
+        if cached and cached[:2] == (version, token):
+            return cached[2]
+
+        from telegram.ext import ExtBot
+
+        bot = ExtBot(
+            token=token,
+            request=_request,
+            get_updates_request=_request,
+        )
+        run_async(bot.initialize())
+        # A replaced client is not shut down: that would close the shared pool
+        _bots[key] = (version, token, bot)
+        return bot
+
+
+def run_async(coro, timeout=CALL_TIMEOUT):
+    """
+    Runs a coroutine on the process' bot event loop and returns its result
+
+    coro: `Coroutine`
+        e.g. ``get_bot_client(bot).send_message(...)``
+    timeout: `float`
+        Seconds to wait before raising `TimeoutError`
+    """
+    return submit_async(coro).result(timeout)
+
+
+def submit_async(coro):
+    """
+    Schedules a coroutine on the process' bot event loop
+
+    Returns a `concurrent.futures.Future` of its result
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop())
+
+
+def _get_loop():
+    global _loop, _loop_pid, _request
+
+    # Threads do not survive a fork, so a forked RQ work horse starts afresh
+    if _loop_pid != os.getpid():
+        with _bots_lock:
+            if _loop_pid != os.getpid():
+                from telegram.request import HTTPXRequest
+
+                _loop = asyncio.new_event_loop()
+                threading.Thread(target=_loop.run_forever, name="telegram-bots", daemon=True).start()
+                _request = HTTPXRequest(connection_pool_size=CONNECTION_POOL_SIZE)
+                _bots.clear()
+                _rate_limiters.clear()
+                _loop_pid = os.getpid()
+    return _loop
+
+
+def get_rate_limiter(telegram_bot: str) -> "RateLimiter":
+    """
+    Returns the process' RateLimiter of a Telegram Bot, for use on the bot event loop
+
+    telegram_bot: `str`
+        Name of the Telegram Bot
+    """
+    key = (frappe.local.site, telegram_bot)
+    _get_loop()
+    with _bots_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = RateLimiter(MESSAGES_PER_SECOND)
+        return _rate_limiters[key]
+
+
+class RateLimiter:
+    """
+    Spaces calls out to at most `rate` per second
+
+    Only awaited on the bot event loop, so it needs no locking.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self.next_at = 0.0
+
+    async def run(self, coro):
+        """Awaits `coro` once a slot is free"""
+        await self.wait()
+        return await coro
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        at = max(now, self.next_at)
+        self.next_at = at + self.interval
+        if at > now:
+            await asyncio.sleep(at - now)
@@ -1,4 +1,36 @@
 import re
+from html import escape
+from html.parser import HTMLParser
+
+# Only a set of formatting options are supported
+# https://core.telegram.org/bots/api#formatting-options
+TAGS_SUPPORTED = [
+    "b", "strong",              # Bold
+    "i", "em",                  # Italics
+    "u", "ins",                 # Underline
+    "s", "strike", "del",       # Strikethrough
+    "a",                        # Links
+    "pre", "code",              # Code
+]
+
+"""
+< /?                    # Permit closing tags
+(?!
+    (?: em | strong )   # List of tags to avoid matching
+    \b                  # Word boundary avoids partial word matches
+)
+[a-z]                   # Tag name initial character must be a-z
+(?: [^>"']              # Any character except >, ", or '
+| "[^"]*"               # Double-quoted attribute value
+| '[^']*'               # Single-quoted attribute value
+)*
+>
+
+https://www.oreilly.com/library/view/regular-expressions-cookbook/9781449327453/ch09s04.html
+"""
+UNSUPPORTED_TAG_RE = re.compile(
+    """</?(?!(?:{})\\b)[a-z](?:[^>"']|"[^"]*"|'[^']*')*>""".format("|".join(TAGS_SUPPORTED)))
+STRAY_LT_RE = re.compile(r"<(?!(?:[a-z]+|\/[a-z]+)\b)")
 
 
 def strip_unsupported_html_tags(txt: str) -> str:
@@ -6,48 +38,270 @@ def strip_unsupported_html_tags(txt: str) -> str:
     Only a set of formatting options are supported
     https://core.telegram.org/bots/api#formatting-options
     """
-    tags_supported = [
-        "b", "strong",              # Bold
-        "i", "em",                  # Italics
-        "u", "ins",                 # Underline
-        "s", "strike", "del",       # Strikethrough
-        "a",                        # Links
-        "pre", "code",              # Code
-    ]
-
     # Replace Unsupported Tags
-    """
-    < /?                    # Permit closing tags
-    (?!
-        (?: em | strong )   # List of tags to avoid matching
-        \b                  # Word boundary avoids partial word matches
-    )
-    [a-z]                   # Tag name initial character must be a-z
-    (?: [^>"']              # Any character except >, ", or '
-    | "[^"]*"               # Double-quoted attribute value
-    | '[^']*'               # Single-quoted attribute value
-    )*
-    >
-
-    https://www.oreilly.com/library/view/regular-expressions-cookbook/9781449327453/ch09s04.html
-    """
-    r = """</?(?!(?:{})\\b)[a-z](?:[^>"']|"[^"]*"|'[^']*')*>""".format("|".join(tags_supported))
-    txt = re.sub(
-        pattern=r,
-        repl="",
-        string=txt)
+    txt = UNSUPPORTED_TAG_RE.sub("", txt)
 
     #   &   &amp;
     txt = txt.replace("&", "&amp;")
 
     #   <   &lt;
-    txt = re.sub(
-        pattern=r"<(?!(?:[a-z]+|\/[a-z]+)\b)",
-        repl="&lt;",
-        string=txt,
-    )
+    txt = STRAY_LT_RE.sub("&lt;", txt)
 
     #   >   $gt;
     # Seems to go through well
 
     return txt
+
+
+def html_to_telegram_html(html: str) -> str:
+    """
+    Convert editor HTML (e.g. a helpdesk reply) to the HTML subset Telegram accepts
+
+    Paragraphs, line breaks, headings and lists become plain-text layout; bold,
+    italic, underline, strikethrough, links, code, pre and blockquote are kept.
+    Text is escaped and the output is always balanced. Runs in a single pass.
+    """
+    return _convert(html, keep_formatting=True)
+
+
+def html_to_text(html: str) -> str:
+    """
+    Convert editor HTML to plain text, keeping paragraph, line and list layout
+    """
+    return _convert(html, keep_formatting=False)
+
+
+def _convert(html, keep_formatting):
+    if not html:
+        return ""
+    converter = _TelegramHTMLConverter(keep_formatting)
+    converter.feed(html)
+    converter.close()
+    return converter.get_output()
+
+
+# Editor tag -> Telegram tag
+_FORMATTING_TAGS = {
+    "b": "b", "strong": "b",
+    "i": "i", "em": "i",
+    "u": "u", "ins": "u",
+    "s": "s", "strike": "s", "del": "s",
+    "code": "code",
+    "pre": "pre",
+    "blockquote": "blockquote",
+    "a": "a",
+}
+_HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_PARAGRAPHS = {"p", "table", "hr"}
+_LINES = {"div", "tr", "section", "article", "header", "footer", "dd", "dt"}
+_SKIPPED = {"script", "style", "head", "title", "template"}
+_SAFE_HREF_RE = re.compile(r"^(?:https?|mailto|tg):", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class _TelegramHTMLConverter(HTMLParser):
+    """
+    Streaming converter behind `html_to_telegram_html` and `html_to_text`
+
+    Opening tags are written lazily, right before the first text inside them,
+    so empty elements leave nothing behind. Block elements only request
+    newlines, which are written before the next text, so the output never
+    starts or ends with blank lines.
+    """
+
+    def __init__(self, keep_formatting=True):
+        super().__init__(convert_charrefs=True)
+        self.keep_formatting = keep_formatting
+        self.out = []
+        self.open_tags = []         # [telegram tag, opening markup, written], or [None, dropped tag, False]
+        self.lists = []             # [ordered, item count]
+        self.pending_newlines = 0
+        self.pending_marker = ""
+        self.at_line_start = True
+        self.skip_depth = 0
+        self.pre_depth = 0
+        self.link_depth = 0
+
+    def get_output(self):
+        if self.out and not self.pre_depth:
+            self.out[-1] = self.out[-1].rstrip(" ")
+        for tag, _, written in reversed(self.open_tags):
+            if written:
+                self.out.append(f"</{tag}>")
+        self.open_tags = []
+        return "".join(self.out)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIPPED:
+            self.skip_depth += 1
+        elif tag == "br":
+            self._request_newlines(1, force=True)
+        elif tag in _PARAGRAPHS:
+            self._request_newlines(2)
+        elif tag in _LINES:
+            self._request_newlines(1)
+        elif tag in _HEADINGS:
+            self._request_newlines(2)
+            self._open("b")
+        elif tag in ("ul", "ol"):
+            self._request_newlines(1)
+            self.lists.append([tag == "ol", 0])
+        elif tag == "li":
+            self._start_list_item()
+        elif tag in ("td", "th"):
+            if not self.at_line_start:
+                self._write_text(" ")
+        elif tag in _FORMATTING_TAGS:
+            self._start_formatting(tag, dict(attrs))
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in _PARAGRAPHS:
+            self._request_newlines(2)
+        elif tag in _LINES:
+            self._request_newlines(1)
+        elif tag in _HEADINGS:
+            self._close("b")
+            self._request_newlines(2)
+        elif tag in ("ul", "ol"):
+            if self.lists:
+                self.lists.pop()
+            self._request_newlines(1 if self.lists else 2)
+        elif tag == "li":
+            self.pending_marker = ""
+            self._request_newlines(1)
+        elif tag in _FORMATTING_TAGS:
+            self._end_formatting(tag)
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        if not self.pre_depth:
+            data = _WHITESPACE_RE.sub(" ", data)
+        self._write_text(data)
+
+    # --- Blocks ---
+
+    def _request_newlines(self, count, force=False):
+        if self.pre_depth or not self.out:
+            return
+        if force:
+            # <br> always breaks, and two in a row leave a blank line
+            self.pending_newlines += count
+        elif not self.pending_marker:
+            # Paragraphs inside list items only start a new line
+            if self.lists:
+                count = 1
+            self.pending_newlines = max(self.pending_newlines, count)
+
+    def _start_list_item(self):
+        self._request_newlines(1)
+        if not self.lists:
+            self.lists.append([False, 0])
+        current = self.lists[-1]
+        current[1] += 1
+        indent = "  " * (len(self.lists) - 1)
+        self.pending_marker = indent + (f"{current[1]}. " if current[0] else "• ")
+
+    # --- Formatting ---
+
+    def _start_formatting(self, tag, attrs):
+        telegram_tag = _FORMATTING_TAGS[tag]
+        if telegram_tag in ("pre", "blockquote"):
+            self._request_newlines(2 if telegram_tag == "pre" else 1)
+        if telegram_tag == "pre":
+            self.pre_depth += 1
+
+        if self.pre_depth and telegram_tag != "pre" or self._inside("code"):
+            # Telegram does not allow entities, links included, inside code blocks
+            self._drop(telegram_tag)
+        elif telegram_tag == "a":
+            href = (attrs.get("href") or "").strip()
+            if self.link_depth or not _SAFE_HREF_RE.match(href):
+                # Keep the text of unsafe, relative or nested links, drop the link
+                self._drop("a")
+                return
+            self.link_depth += 1
+            self._open("a", f'<a href="{escape(href)}">')
+        elif telegram_tag == "blockquote" and self._inside("blockquote"):
+            # Telegram blockquotes cannot nest, so inner quotes join the outer one
+            self._drop("blockquote")
+        else:
+            self._open(telegram_tag)
+
+    def _end_formatting(self, tag):
+        telegram_tag = _FORMATTING_TAGS[tag]
+        closed = self._close(telegram_tag)
+        if not closed:
+            return
+        if telegram_tag == "a" and closed[0]:
+            self.link_depth -= 1
+        if telegram_tag == "pre":
+            self.pre_depth = max(0, self.pre_depth - 1)
+            self._request_newlines(2)
+        elif telegram_tag == "blockquote":
+            self._request_newlines(1)
+
+    def _inside(self, telegram_tag):
+        return any(entry[0] == telegram_tag for entry in self.open_tags)
+
+    def _open(self, telegram_tag, markup=None):
+        self.open_tags.append([telegram_tag, markup or f"<{telegram_tag}>", False])
+
+    def _drop(self, telegram_tag):
+        """Track a `telegram_tag` that is kept as plain text so its end tag still pairs up"""
+        self.open_tags.append([None, telegram_tag, False])
+
+    def _close(self, telegram_tag):
+        """Close the innermost open or dropped `telegram_tag`, reopening anything nested in it"""
+        for index in range(len(self.open_tags) - 1, -1, -1):
+            tag, markup, _ = self.open_tags[index]
+            if tag == telegram_tag or tag is None and markup == telegram_tag:
+                break
+        else:
+            return None
+
+        nested = self.open_tags[index + 1:]
+        entry = self.open_tags[index]
+        for tag, _, written in reversed(nested):
+            if written:
+                self._write_markup(f"</{tag}>")
+        if entry[2] and entry[0]:
+            self._write_markup(f"</{telegram_tag}>")
+
+        del self.open_tags[index:]
+        for tag, markup, _ in nested:
+            self.open_tags.append([tag, markup, False])
+        return entry
+
+    # --- Output ---
+
+    def _write_markup(self, markup):
+        if self.keep_formatting:
+            self.out.append(markup)
+
+    def _write_text(self, text):
+        if self.pending_newlines:
+            if self.out and self.out[-1].endswith(" "):
+                self.out[-1] = self.out[-1].rstrip(" ")
+            self.out.append("\n" * self.pending_newlines)
+            self.pending_newlines = 0
+            self.at_line_start = True
+
+        if self.at_line_start and not self.pre_depth:
+            text = text.lstrip(" ")
+        if not text:
+            return
+
+        if self.pending_marker:
+            self.out.append(self.pending_marker)
+            self.pending_marker = ""
+
+        for entry in self.open_tags:
+            if entry[0] and not entry[2]:
+                self._write_markup(entry[1])
+                entry[2] = True
+
+        self.out.append(escape(text, quote=False) if self.keep_formatting else text)
+        self.at_line_start = text.endswith("\n")
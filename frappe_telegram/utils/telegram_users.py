@@ -0,0 +1,94 @@
+"""
+Resolves Frappe Users and Telegram Users to Telegram user ids (private chat ids).
+
+Ids are cached in one Redis hash, including negative answers, so repeated
+sends to the same people never reach the database. A lookup with misses
+costs a single query for all of them. Any change to a Telegram User drops
+the whole hash once committed, since a Telegram User can be relinked to
+another User. The hash also expires USER_IDS_TTL seconds after it was
+started, so a missed invalidation does not last.
+"""
+import frappe
+
+USER_IDS_KEY = "telegram_user_ids"
+USER_IDS_TTL = 6 * 3600
+
+
+def resolve_telegram_user_ids(users=None, telegram_users=None) -> dict:
+    """
+    Returns {name: telegram_user_id} for the given names that have a Telegram user id
+
+    users: `list`
+        Names of Frappe Users, resolved through their linked Telegram User
+    telegram_users: `list`
+        Names of Telegram Users
+    """
+    fields = [f"user:{u}" for u in set(users or []) if u]
+    fields += [f"telegram_user:{t}" for t in set(telegram_users or []) if t]
+    if not fields:
+        return {}
+
+    key = frappe.cache.make_key(USER_IDS_KEY)
+    found = dict(zip(fields, frappe.cache.hmget(key, fields)))
+    missing = [field for field, value in found.items() if value is None]
+    if missing:
+        loaded = _load_telegram_user_ids(missing)
+        # Raw client call: the wrapped hset pickles values one at a time
+        pipe = frappe.cache.pipeline()
+        pipe.hset(key, mapping=loaded)
+        pipe.ttl(key)
+        if pipe.execute()[1] < 0:
+            # Only a new hash gets its expiry; later writes must not extend it
+            frappe.cache.expire(key, USER_IDS_TTL)
+        found.update(loaded)
+
+    return {
+        field.split(":", 1)[1]: frappe.safe_decode(value)
+        for field, value in found.items()
+        if value
+    }
+
+
+def clear_telegram_user_id_cache():
+    """Drops the cached ids once the current transaction commits"""
+    frappe.db.after_commit.add(_delete_telegram_user_ids)
+
+
+def _delete_telegram_user_ids():
+    frappe.cache.delete_value(USER_IDS_KEY)
+
+
+def _load_telegram_user_ids(fields):
+    """Reads every missing field in one query; unresolved ones map to an empty string"""
+    users = [f.split(":", 1)[1] for f in fields if f.startswith("user:")]
+    telegram_users = [f.split(":", 1)[1] for f in fields if f.startswith("telegram_user:")]
+
+    TelegramUser = frappe.qb.DocType("Telegram User")
+    condition = None
+    if users:
+        condition = TelegramUser.user.isin(users)
+    if telegram_users:
+        by_name = TelegramUser.name.isin(telegram_users)
+        condition = by_name if condition is None else condition | by_name
+
+    loaded = dict.fromkeys(fields, "")
+    # Most recently modified first, like frappe.db.get_value, so setdefault
+    # keeps that Telegram User for a User linked to several
+    rows = (
+        frappe.qb.from_(TelegramUser)
+        .select(TelegramUser.name, TelegramUser.user, TelegramUser.telegram_user_id)
+        .where(condition)
+        .orderby(TelegramUser.modified, order=frappe.qb.desc)
+        .run(as_dict=True)
+    )
+    resolved = {}
+    for row in rows:
+        if not row.telegram_user_id:
+            continue
+        if row.name in telegram_users:
+            resolved.setdefault(f"telegram_user:{row.name}", row.telegram_user_id)
+        if row.user in users:
+            resolved.setdefault(f"user:{row.user}", row.telegram_user_id)
+
+    loaded.update(resolved)
+    return loaded
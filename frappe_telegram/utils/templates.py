@@ -0,0 +1,141 @@
+"""
+Compiled Jinja templates for Telegram messages.
+
+Parsing and compiling Jinja source costs far more than rendering it, so each
+process keeps the compiled templates it has used, keyed by site since one
+process serves several. Telegram Message Template records are compiled once
+per (name, language, modified), so a saved edit is picked up on the next
+render; free-form sources such as settings fields are compiled once per
+distinct source.
+
+Compiled code is bound to frappe's Jinja environment of the current request
+on every render, which costs next to nothing. Templates therefore behave
+exactly as with ``frappe.render_template``: same sandbox, undefined handling,
+includes, hook filters and request-bound globals.
+
+Template sources of all records are loaded with one query and cached in
+Redis as one map, indexed by language, so a render costs a cache read (served
+from memory after the first one in a request or job) instead of a document
+load. The map is dropped whenever a template is saved or deleted.
+
+A language falls back along its chain: "pt-BR" tries "pt-BR", then "pt",
+then the default template.
+"""
+from collections import OrderedDict
+
+import frappe
+from frappe import _
+
+TEMPLATE_DOCTYPE = "Telegram Message Template"
+SOURCES_CACHE_KEY = "telegram_message_template_sources"
+MAX_COMPILED_TEMPLATES = 512
+
+_compiled = OrderedDict()
+
+
+def render_named_template(name: str, context: dict = None, lang: str = None, default: str = None) -> str:
+    """
+    Render a Telegram Message Template by name
+
+    name: `str`
+        Name of a Telegram Message Template
+    context: `dict`
+        dict of key:values to resolve the tags in the template
+    lang: `str`
+        Use the translation for this language, or for its base language
+        ("pt" for "pt-BR"), when the template has one
+    default: `str`
+        Source rendered when no template with that name exists. If not set,
+        a missing template raises an error
+    """
+    record = get_template_sources().get(name)
+    if not record:
+        if default is None:
+            frappe.throw(_("No template with name '{0}' exists.").format(name))
+        return render_source(default, context)
+
+    lang, source = _resolve_translation(record["translations"], lang)
+    if source is None:
+        lang, source = None, record["default"]
+
+    template = _get_template((name, lang, record["modified"]), source)
+    return template.render(context or {})
+
+
+def render_source(source: str, context: dict = None) -> str:
+    """Render a Jinja source string, compiling it only the first time it is seen"""
+    return _get_template(("source", source), source).render(context or {})
+
+
+def get_template_sources() -> dict:
+    """
+    Returns the sources of all Telegram Message Templates as
+    `{name: {"modified": str, "default": str, "translations": {lang: str}}}`
+    """
+    sources = frappe.cache.get_value(SOURCES_CACHE_KEY)
+    if sources is None:
+        sources = _load_template_sources()
+        frappe.cache.set_value(SOURCES_CACHE_KEY, sources)
+    return sources
+
+
+def clear_template_cache(doc=None, method=None):
+    frappe.cache.delete_value(SOURCES_CACHE_KEY)
+
+
+def _resolve_translation(translations, lang):
+    """Returns (language, source) of the first translation along the fallback chain of `lang`"""
+    while lang:
+        if translations.get(lang):
+            return lang, translations[lang]
+        lang = lang.rpartition("-")[0]
+    return None, None
+
+
+def _load_template_sources():
+    Template = frappe.qb.DocType(TEMPLATE_DOCTYPE)
+    Translation = frappe.qb.DocType("Telegram Message Template Translation")
+    rows = (
+        frappe.qb.from_(Template)
+        .left_join(Translation)
+        .on((Translation.parent == Template.name) & (Translation.parenttype == TEMPLATE_DOCTYPE))
+        .select(
+            Template.name,
+            Template.modified,
+            Template.default_template,
+            Translation.language,
+            Translation.template,
+        )
+        .orderby(Translation.idx)
+        .run(as_dict=True)
+    )
+
+    sources = {}
+    for row in rows:
+        record = sources.setdefault(
+            row.name,
+            {"modified": str(row.modified), "default": row.default_template or "", "translations": {}},
+        )
+        if row.language and row.template:
+            record["translations"].setdefault(row.language, row.template)
+    return sources
+
+
+def _get_template(key, source):
+    jenv = frappe.get_jenv()
+
+    # Records of the same name and modified time on two sites may differ
+    key = (frappe.local.site, *key)
+    code = _compiled.get(key)
+    if code is not None:
+        _compiled.move_to_end(key)
+    else:
+        if ".__" in source:
+            frappe.throw(_("Illegal template"))
+
+        code = jenv.compile(source)
+        _compiled[key] = code
+        if len(_compiled) > MAX_COMPILED_TEMPLATES:
+            _compiled.popitem(last=False)
+
+    return jenv.template_class.from_code(jenv, code, jenv.make_globals(None))
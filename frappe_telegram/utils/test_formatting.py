@@ -0,0 +1,84 @@
+import unittest
+
+from frappe_telegram.utils.formatting import html_to_telegram_html, html_to_text
+
+# Agent replies as saved by the helpdesk Text Editor
+REPLY_CORPUS = [
+    (
+        "<p>Hi Maria,</p><p>Thanks for reaching out. Could you please try the steps below?</p>"
+        "<ol><li><p>Open <strong>Settings</strong> → <em>Accounts</em></p></li>"
+        "<li><p>Click <a href=\"https://help.example.com/reset?user=42&amp;src=tg\">Reset password</a></p></li>"
+        "</ol><p>Let us know if that works.</p><p>Best regards,<br>Support Team</p>",
+        "Hi Maria,\n\nThanks for reaching out. Could you please try the steps below?\n\n"
+        "1. Open <b>Settings</b> → <i>Accounts</i>\n"
+        "2. Click <a href=\"https://help.example.com/reset?user=42&amp;src=tg\">Reset password</a>\n\n"
+        "Let us know if that works.\n\nBest regards,\nSupport Team",
+    ),
+    (
+        "<div>Invoice total &lt; 100 &amp; paid</div><div><br></div><div>Thanks</div>",
+        "Invoice total &lt; 100 &amp; paid\n\nThanks",
+    ),
+    (
+        "<p>Please run:</p><pre><code class=\"language-bash\">bench --site all migrate\n"
+        "bench restart</code></pre><p>and try again.</p>",
+        "Please run:\n\n<pre>bench --site all migrate\nbench restart</pre>\n\nand try again.",
+    ),
+    (
+        "<ul><li>Printer<ul><li>Model: <code>HP-4020</code></li></ul></li><li>Scanner</li></ul>",
+        "• Printer\n  • Model: <code>HP-4020</code>\n• Scanner",
+    ),
+    (
+        "<blockquote><p>It keeps crashing</p></blockquote><p>We shipped a fix today.</p>",
+        "<blockquote>It keeps crashing</blockquote>\n\nWe shipped a fix today.",
+    ),
+]
+
+
+class TestHTMLToTelegramHTML(unittest.TestCase):
+    def test_reply_corpus(self):
+        for html, expected in REPLY_CORPUS:
+            self.assertEqual(html_to_telegram_html(html), expected)
+
+    def test_overlapping_tags_are_balanced(self):
+        self.assertEqual(
+            html_to_telegram_html("<p><strong>bold <em>both</strong> italic</em></p>"),
+            "<b>bold <i>both</i></b><i> italic</i>",
+        )
+
+    def test_unclosed_tags_are_closed(self):
+        self.assertEqual(html_to_telegram_html("<b>bold <i>italic"), "<b>bold <i>italic</i></b>")
+
+    def test_unsafe_links_and_scripts_are_dropped(self):
+        self.assertEqual(
+            html_to_telegram_html('<p><a href="javascript:alert(1)">click</a><script>x()</script></p>'),
+            "click",
+        )
+
+    def test_no_formatting_inside_code(self):
+        self.assertEqual(html_to_telegram_html("<code>a <b>b</b></code>"), "<code>a b</code>")
+
+    def test_no_links_inside_code(self):
+        self.assertEqual(
+            html_to_telegram_html('<pre><code>see <a href="https://example.com">docs</a></code></pre>'),
+            "<pre>see docs</pre>",
+        )
+        self.assertEqual(
+            html_to_telegram_html('<code><a href="https://example.com">x</a></code> <a href="https://example.com">y</a>'),
+            '<code>x</code> <a href="https://example.com">y</a>',
+        )
+
+    def test_nested_blockquotes_are_flattened(self):
+        self.assertEqual(
+            html_to_telegram_html("<blockquote>outer<blockquote>inner</blockquote>after</blockquote>tail"),
+            "<blockquote>outer\ninner\nafter</blockquote>\ntail",
+        )
+
+    def test_empty_content(self):
+        for html in ("", "<p></p>", "<p><br></p>", "<p><strong> </strong></p>"):
+            self.assertEqual(html_to_telegram_html(html), "")
+
+    def test_plain_text(self):
+        self.assertEqual(
+            html_to_text("<p>1 &lt; 2 &amp; <b>3</b></p><ul><li>a</li><li>b</li></ul>"),
+            "1 < 2 & 3\n\n• a\n• b",
+        )
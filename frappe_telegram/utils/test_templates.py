@@ -0,0 +1,22 @@
+import unittest
+
+from frappe_telegram.utils.templates import _resolve_translation
+
+TRANSLATIONS = {
+    "pt": "Olá {{ name }}",
+    "pt-BR": "Oi {{ name }}",
+    "zh": "你好 {{ name }}",
+}
+
+
+class TestResolveTranslation(unittest.TestCase):
+    def test_exact_language(self):
+        self.assertEqual(_resolve_translation(TRANSLATIONS, "pt-BR"), ("pt-BR", "Oi {{ name }}"))
+
+    def test_falls_back_to_base_language(self):
+        self.assertEqual(_resolve_translation(TRANSLATIONS, "pt-PT"), ("pt", "Olá {{ name }}"))
+        self.assertEqual(_resolve_translation(TRANSLATIONS, "zh-TW"), ("zh", "你好 {{ name }}"))
+
+    def test_no_translation(self):
+        self.assertEqual(_resolve_translation(TRANSLATIONS, "de-AT"), (None, None))
+        self.assertEqual(_resolve_translation(TRANSLATIONS, None), (None, None))